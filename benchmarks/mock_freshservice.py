@@ -0,0 +1,236 @@
+"""
+Local stand-in for the Freshservice API used by the benchmarks.
+
+Serves requesters, tickets, reference collections and ticket creation
+with configurable latency, directory size, rate-limit headers and error
+injection.
+"""
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockConfig:
+    def __init__(
+        self,
+        requesters=5000,
+        tickets=1000,
+        latency=0.02,
+        error_rate=0.0,
+        rate_limit=None,
+        extra_fields=30,
+        changed_requesters=50,
+    ):
+        self.requesters = requesters
+        # Requesters returned by an updated_at filter query (incremental sync)
+        self.changed_requesters = changed_requesters
+        self.tickets = tickets
+        # Seconds added to every response, to stand in for WAN round-trips
+        self.latency = latency
+        # Fraction of requests answered with a 503
+        self.error_rate = error_rate
+        # Requests per minute before answering 429; None disables the limit
+        self.rate_limit = rate_limit
+        # Filler fields per requester, to approximate real record size
+        self.extra_fields = extra_fields
+
+
+def make_requester(i, extra_fields):
+    requester = {
+        "id": i,
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"first{i}.last{i}@example.com",
+        "department_ids": [i % 25],
+        "active": True,
+        "updated_at": "2026-01-01T00:00:00Z",
+    }
+    for n in range(extra_fields):
+        requester[f"field_{n}"] = f"value {n} for requester {i}"
+    return requester
+
+
+class MockState:
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.requests = 0
+        self.created = 0
+        self.uploaded_bytes = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def take(self):
+        """
+        Counts a request against the per-minute window. Returns (remaining,
+        retry_after); remaining is None when rate limiting is disabled and
+        negative when the request should be throttled.
+        """
+        with self.lock:
+            self.requests += 1
+            if self.config.rate_limit is None:
+                return None, 0
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            if self.window_count >= self.config.rate_limit:
+                self.throttled += 1
+                return -1, 60 - (now - self.window_start)
+            self.window_count += 1
+            return self.config.rate_limit - self.window_count, 0
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without TCP_NODELAY,
+        # Nagle plus delayed ACK adds ~40 ms to every small response.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _admit(self):
+        """
+        Applies latency, rate limiting and error injection. Returns the
+        rate-limit headers, or None if a response was already sent.
+        """
+        config = self.state.config
+        if config.latency:
+            time.sleep(config.latency)
+        remaining, retry_after = self.state.take()
+        headers = {}
+        if config.rate_limit is not None:
+            headers["X-RateLimit-Total"] = str(config.rate_limit)
+            headers["X-RateLimit-Remaining"] = str(max(remaining, 0))
+        if remaining is not None and remaining < 0:
+            headers["Retry-After"] = str(max(1, int(retry_after)))
+            self._send(429, {"message": "rate limited"}, headers)
+            return None
+        if config.error_rate and random.random() < config.error_rate:
+            with self.state.lock:
+                self.state.errors += 1
+            self._send(503, {"message": "injected error"}, headers)
+            return None
+        return headers
+
+    def _page(self, items_total, query, make_item, key):
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        start = (page - 1) * per_page
+        items = [make_item(i) for i in range(start, min(start + per_page, items_total))]
+        return {key: items}
+
+    def do_GET(self):
+        headers = self._admit()
+        if headers is None:
+            return
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/")
+        config = self.state.config
+
+        if path.endswith("/requesters"):
+            body = self._page(
+                config.changed_requesters if "query" in query else config.requesters,
+                query,
+                lambda i: make_requester(i, config.extra_fields),
+                "requesters",
+            )
+        elif path.endswith("/tickets") or path.endswith("/tickets/filter"):
+            body = self._page(
+                config.tickets,
+                query,
+                lambda i: {"id": i, "subject": f"Ticket {i}", "status": 2},
+                "tickets",
+            )
+        elif path.rsplit("/", 2)[-2] in ("requesters", "tickets"):
+            kind, item_id = path.rsplit("/", 2)[-2:]
+            etag = f'"{kind}-{item_id}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, None, {**headers, "ETag": etag})
+                return
+            if kind == "requesters":
+                body = {"requester": make_requester(int(item_id), config.extra_fields)}
+            else:
+                body = {"ticket": {"id": int(item_id), "subject": f"Ticket {item_id}"}}
+            headers["ETag"] = etag
+        elif path.endswith("/ticket_form_fields"):
+            body = {"ticket_fields": []}
+        else:
+            # Reference collections: groups, agents, departments, locations
+            key = path.rsplit("/", 1)[-1]
+            page = int(query.get("page", ["1"])[0])
+            body = {key: [{"id": 1, "name": f"Default {key}"}] if page == 1 else []}
+        self._send(200, body, headers)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        remaining = length
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 16)))
+        headers = self._admit()
+        if headers is None:
+            return
+        with self.state.lock:
+            self.state.uploaded_bytes += length
+            self.state.created += 1
+            ticket_id = self.state.created
+        if urlparse(self.path).path.rstrip("/").endswith("/reply"):
+            self._send(201, {"conversation": {"id": ticket_id}}, headers)
+        else:
+            self._send(201, {"ticket": {"id": ticket_id}}, headers)
+
+
+class MockFreshservice:
+    """
+    Runs the mock API on a background thread. Use as a context manager;
+    base_url points at the equivalent of https://<domain>/api/v2.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.state = MockState(self.config)
+        handler = type("Handler", (MockHandler,), {"state": self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
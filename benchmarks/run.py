@@ -0,0 +1,199 @@
+"""
+Benchmarks for fresh.py against a local mock Freshservice server.
+
+Run from the project root:
+
+    python -m benchmarks.run --requesters 20000 --latency 0.05 --output bench.json
+
+Results are printed (and optionally written) as JSON for regression
+tracking.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.mock_freshservice import MockConfig, MockFreshservice
+from fresh import FreshServiceAPI, RequesterDirectory, RequesterStore
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+    }
+
+
+def make_client(server, args):
+    return FreshServiceAPI(
+        server.base_url,
+        f"{server.base_url}/requesters",
+        "benchmark",
+        pool_size=max(args.workers),
+        rate_limit=args.client_rate_limit,
+    )
+
+
+def bench_sync(server, args, workdir):
+    results = {}
+    for workers in args.workers:
+        api = make_client(server, args)
+        output = os.path.join(workdir, f"requesters_{workers}.json")
+        response, elapsed = timed(api.get_requesters, output, max_workers=workers)
+        results[f"workers_{workers}"] = {
+            "seconds": elapsed,
+            "requesters": len(response["requesters"]),
+            "requesters_per_second": len(response["requesters"]) / elapsed,
+            "file_bytes": os.path.getsize(output),
+        }
+        api.close()
+
+    api = make_client(server, args)
+    _, elapsed = timed(api.sync_requesters, output)
+    results["incremental"] = {"seconds": elapsed}
+    api.close()
+    return results, output
+
+
+def bench_memory(server, args, workdir):
+    """
+    Peak traced memory of a full sync and of a streaming export. Measured
+    separately because tracemalloc slows allocation enough to skew timings.
+    """
+    api = make_client(server, args)
+    results = {}
+    tracemalloc.start()
+    api.get_requesters(os.path.join(workdir, "memory.json"))
+    results["get_requesters_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    api.export_requesters(os.path.join(workdir, "memory.ndjson"))
+    results["export_requesters_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    api.close()
+    return results
+
+
+def bench_tickets(server, args):
+    api = make_client(server, args)
+    specs = [
+        {"subject": f"Benchmark {i}", "description": "Benchmark ticket", "status": 2}
+        for i in range(args.tickets)
+    ]
+    _, serial = timed(lambda: [api.create_ticket(**spec) for spec in specs])
+    results = {"serial": {"seconds": serial, "tickets_per_second": len(specs) / serial}}
+    for workers in args.workers:
+        created, elapsed = timed(api.create_tickets, specs, max_workers=workers)
+        results[f"bulk_workers_{workers}"] = {
+            "seconds": elapsed,
+            "tickets_per_second": len(specs) / elapsed,
+            "failed": sum(1 for r in created if not r.ok),
+        }
+    api.close()
+    return results
+
+
+def bench_lookups(requesters_file, args, workdir):
+    with open(requesters_file, "r", encoding="utf-8") as f:
+        requesters = json.load(f)["requesters"]
+    emails = [r["email"] for r in requesters[:: max(1, len(requesters) // 1000)]]
+
+    directory = RequesterDirectory(requesters_file)
+    _, load_seconds = timed(directory.load)
+    email_samples = [timed(directory.get_by_email, email)[1] for email in emails]
+    _, index_seconds = timed(directory.prepare_search)
+    search_samples = [
+        timed(directory.search, email.split(".")[0][:6])[1] for email in emails
+    ]
+
+    store = RequesterStore(os.path.join(workdir, "requesters.db"))
+    _, store_seconds = timed(store.replace, requesters)
+    store_samples = [timed(store.get_by_email, email)[1] for email in emails]
+    store.close()
+
+    return {
+        "directory_load_seconds": load_seconds,
+        "directory_email_lookup": percentiles(email_samples),
+        "search_index_build_seconds": index_seconds,
+        "search_prefix_query": percentiles(search_samples),
+        "store_replace_seconds": store_seconds,
+        "store_email_lookup": percentiles(store_samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requesters", type=int, default=5000)
+    parser.add_argument(
+        "--changed-requesters",
+        type=int,
+        default=50,
+        help="requesters returned to an incremental sync",
+    )
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--server-rate-limit", type=int, default=None, help="mock 429 limit per minute"
+    )
+    parser.add_argument("--client-rate-limit", type=int, default=100000)
+    parser.add_argument("--extra-fields", type=int, default=30)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 4, 8], help="worker counts to compare"
+    )
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        requesters=args.requesters,
+        changed_requesters=args.changed_requesters,
+        tickets=args.tickets,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.server_rate_limit,
+        extra_fields=args.extra_fields,
+    )
+    with MockFreshservice(config) as server, tempfile.TemporaryDirectory() as workdir:
+        sync, requesters_file = bench_sync(server, args, workdir)
+        memory = bench_memory(server, args, workdir)
+        tickets = bench_tickets(server, args)
+        lookups = bench_lookups(requesters_file, args, workdir)
+        server_stats = {
+            "requests": server.state.requests,
+            "throttled": server.state.throttled,
+            "injected_errors": server.state.errors,
+        }
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "requester_sync": sync,
+        "memory": memory,
+        "ticket_creation": tickets,
+        "requester_lookup": lookups,
+        "server": server_stats,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
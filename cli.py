@@ -0,0 +1,229 @@
+"""
+Headless command-line interface to fresh.py, for cron jobs and scripts.
+
+    python cli.py sync --incremental --workers 4
+    python cli.py sync --format ndjson --output requesters.ndjson
+    python cli.py tickets new_tickets.csv --workers 4
+    python cli.py lookup jane.doe@company.com
+    python cli.py lookup --search "jan do"
+
+Credentials are read from API_KEY, API_URL and REQUESTER_URL (or a .env
+file) exactly as the GUI does. Lookups only read the local cache and need
+no credentials. Never imports customtkinter.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import fresh
+from fresh import FreshServiceAPI, RequesterDirectory, RequesterStore, load_ticket_specs
+from metrics import LoggingExporter
+from ticket_templates import TicketTemplates
+
+# Found next to cli.py, not in whatever directory cron starts it from
+DEFAULT_TEMPLATES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "ticket_templates.json"
+)
+
+
+def build_api(args):
+    if not fresh.API_KEY or not fresh.TICKET_API_URL or not fresh.REQUESTERS_API_URL:
+        raise SystemExit(
+            "API_KEY, API_URL and REQUESTER_URL must be set in the environment variables."
+        )
+    api = FreshServiceAPI(
+        fresh.TICKET_API_URL,
+        fresh.REQUESTERS_API_URL,
+        fresh.API_KEY,
+        pool_size=max(10, getattr(args, "workers", 1)),
+        rate_limit=args.rate_limit,
+        store=RequesterStore(args.store) if getattr(args, "store", None) else None,
+        requester_fields=None if getattr(args, "all_fields", False) else fresh.REQUESTER_FIELDS,
+    )
+    if args.verbose:
+        api.metrics.add_hook(LoggingExporter())
+    return api
+
+
+def finish(api, args):
+    if args.metrics:
+        api.metrics.write(args.metrics, "json" if args.metrics.endswith(".json") else "prometheus")
+    if api.store is not None:
+        api.store.close()
+    api.close()
+
+
+def cmd_sync(args):
+    if args.incremental and args.format != "json":
+        raise SystemExit("--incremental only applies to the JSON requester cache.")
+    output = args.output or ("requesters.ndjson" if args.format == "ndjson" else "requesters.json")
+    api = build_api(args)
+    try:
+        if args.format == "ndjson":
+            count = api.export_requesters(
+                output, "ndjson", args.per_page, args.max_pages, max_workers=args.workers
+            )
+        else:
+            try:
+                synced = api.shared_sync(
+                    output,
+                    incremental=args.incremental,
+                    max_workers=args.workers,
+                    per_page=args.per_page,
+                    max_pages=args.max_pages,
+                )
+            except TimeoutError as e:
+                raise SystemExit(str(e)) from None
+            if not synced:
+                print(f"{output} was updated by another process; nothing to do.")
+            count = len(RequesterDirectory(output))
+    finally:
+        finish(api, args)
+    print(f"{count} requesters in {output}")
+    return 0
+
+
+def cmd_tickets(args):
+    specs = load_ticket_specs(args.file)
+    templates = None
+    if os.path.exists(args.templates):
+        templates = TicketTemplates.load(args.templates)
+    elif any(spec.get("template") for spec in specs):
+        raise SystemExit(
+            f"{args.file} names ticket templates but {args.templates} was not found; "
+            "pass --templates."
+        )
+    api = build_api(args)
+    api.templates = templates
+    try:
+        results = api.create_tickets(specs, max_workers=args.workers)
+    finally:
+        finish(api, args)
+    failed = [r for r in results if not r.ok]
+    for result in failed:
+        print(
+            f"Row {result.index + 1}: failed ({result.status_code or 'no response'}): {result.error}",
+            file=sys.stderr,
+        )
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {
+                        "index": r.index,
+                        "ticket_id": r.ticket_id,
+                        "status_code": r.status_code,
+                        "error": None if r.error is None else str(r.error),
+                        "latency": r.latency,
+                    }
+                    for r in results
+                ],
+                f,
+                indent=2,
+            )
+    return 1 if failed else 0
+
+
+def cmd_lookup(args):
+    if args.store:
+        source = RequesterStore(args.store)
+        if args.search:
+            matches = source.search_name(args.search, args.limit)
+        elif args.id is not None:
+            matches = [source.get_by_id(args.id)]
+        else:
+            matches = [source.get_by_email(args.email)]
+        source.close()
+    else:
+        if not os.path.exists(args.cache):
+            raise SystemExit(f"{args.cache} not found; run 'python cli.py sync' first.")
+        source = RequesterDirectory(args.cache)
+        if args.search:
+            matches = source.search(args.search, args.limit)
+        elif args.id is not None:
+            matches = [source.get_by_id(args.id)]
+        elif args.name:
+            matches = source.find_by_name(args.name)
+        else:
+            matches = [source.get_by_email(args.email)]
+
+    matches = [m for m in matches if m is not None]
+    for requester in matches:
+        print(json.dumps(requester) if args.json else _describe(requester))
+    return 0 if matches else 1
+
+
+def _describe(requester):
+    name = " ".join(
+        part for part in (requester.get("first_name"), requester.get("last_name")) if part
+    )
+    return f"{requester.get('id')}\t{requester.get('email') or ''}\t{name}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=fresh.DEFAULT_RATE_LIMIT,
+        help="requests per minute (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--metrics", help="write request metrics here (.json, otherwise Prometheus text)"
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    sync = subcommands.add_parser("sync", help="sync the requester cache")
+    sync.add_argument("--incremental", action="store_true", help="only fetch changed requesters")
+    sync.add_argument("--workers", type=int, default=4, help="pages fetched concurrently")
+    sync.add_argument("--format", choices=("json", "ndjson"), default="json")
+    sync.add_argument("--output", help="default: requesters.json or requesters.ndjson")
+    sync.add_argument("--store", help="also update this SQLite requester store")
+    sync.add_argument("--per-page", type=int, default=100)
+    sync.add_argument("--max-pages", type=int, default=200)
+    sync.add_argument(
+        "--all-fields", action="store_true", help="keep every requester field the API returns"
+    )
+    sync.set_defaults(func=cmd_sync)
+
+    tickets = subcommands.add_parser("tickets", help="create tickets from a CSV or JSON file")
+    tickets.add_argument("file")
+    tickets.add_argument("--workers", type=int, default=4)
+    tickets.add_argument("--results", help="write per-ticket results to this JSON file")
+    tickets.add_argument(
+        "--templates",
+        default=DEFAULT_TEMPLATES,
+        help='templates for rows with a "template" column '
+        "(default: ticket_templates.json next to cli.py)",
+    )
+    tickets.set_defaults(func=cmd_tickets)
+
+    lookup = subcommands.add_parser("lookup", help="look up requesters in the local cache")
+    target = lookup.add_mutually_exclusive_group(required=True)
+    target.add_argument("email", nargs="?")
+    target.add_argument("--id", type=int)
+    target.add_argument("--name", help='exact "first last" name')
+    target.add_argument("--search", help="type-ahead search on names and emails")
+    lookup.add_argument("--cache", default="requesters.json")
+    lookup.add_argument("--store", help="read from this SQLite requester store instead")
+    lookup.add_argument("--limit", type=int, default=10)
+    lookup.add_argument("--json", action="store_true", help="print full records as JSON lines")
+    lookup.set_defaults(func=cmd_lookup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(name)s %(message)s")
+    if args.command == "lookup" and args.store and args.name:
+        raise SystemExit("--name is not supported with --store; use --search.")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
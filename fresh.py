@@ -1,10 +1,31 @@
 import requests
 import base64
+import bisect
+import csv
+import heapq
 import os
 import json
+import logging
+import mimetypes
+import random
+import re
+import sqlite3
+import sys
 import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from metrics import Metrics, RequestEvent, endpoint_label
 
 # Init .env file
 load_dotenv()
@@ -13,9 +34,1605 @@ API_KEY = os.getenv("API_KEY")
 TICKET_API_URL = os.getenv("API_URL")
 REQUESTERS_API_URL = os.getenv("REQUESTER_URL")
 
+# (connect, read) timeout in seconds applied to every request
+DEFAULT_TIMEOUT = (5, 30)
+
+# Requests per minute allowed for one account; Freshservice plans range
+# from 100 to 500, so the default stays under the smallest quota.
+DEFAULT_RATE_LIMIT = 100
+DEFAULT_MAX_RETRIES = 4
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Freshservice returns filtered (query=...) results 30 to a page.
+FILTER_PAGE_SIZE = 30
+
+# Requester fields kept in memory and in the cache; everything else the API
+# returns is dropped as each page arrives. "active" drives incremental sync.
+REQUESTER_FIELDS = ("id", "first_name", "last_name", "email", "department_ids", "active")
+
+# Freshservice accepts at most 40 MB of attachments per ticket or reply.
+MAX_ATTACHMENT_BYTES = 40 * 1024 * 1024
+# Attachment bytes uploaded concurrently by one client; more uploads wait.
+UPLOAD_BYTES_IN_FLIGHT = 64 * 1024 * 1024
+
+logger = logging.getLogger("fresh")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every caller of a FreshServiceAPI instance.
+    Tokens refill at rate_per_minute, and the bucket is re-synced from the
+    X-RateLimit-Remaining and Retry-After headers so that quota used by
+    other tools on the same account is taken into account.
+    """
+
+    def __init__(self, rate_per_minute=DEFAULT_RATE_LIMIT, burst=10):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = max(
+                    self.blocked_until - now, (1 - self.tokens) / self.rate
+                )
+            time.sleep(delay)
+
+    def update(self, response):
+        """
+        Adjusts the bucket from the rate-limit headers of a response.
+        """
+        retry_after = parse_retry_after(response)
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        with self.lock:
+            if remaining is not None and remaining.isdigit():
+                # Never spend more than the account has left this window.
+                self.tokens = min(self.tokens, float(remaining))
+            if response.status_code == 429:
+                self.tokens = 0.0
+                pause = retry_after if retry_after is not None else 1 / self.rate
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+
+def parse_retry_after(response):
+    """
+    Returns the Retry-After header in seconds, or None if absent.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Exponential backoff with full jitter for the given retry attempt.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Opens a temporary file next to path for writing and renames it over
+    path only if the block completes, so readers never see a partial file.
+    """
+    # Unique per writer so two processes never share a temporary file
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_version(path):
+    """
+    Cheap change stamp for a file: (mtime_ns, size), or None if missing.
+    Every atomic_write replaces the file, so a new sync always changes it.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SyncLease:
+    """
+    Cross-process lease held in a lock file next to the cache, so only one
+    process on a host or file share syncs at a time. The lock file is
+    created exclusively and touched every lease/3 seconds while held; a
+    lock file older than lease seconds belongs to a process that died and
+    is taken over. Works on network shares, where OS file locks are not
+    reliable.
+    """
+
+    def __init__(self, path, lease=600):
+        self.path = f"{path}.lock"
+        self.lease = lease
+        self.token = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self, timeout=0, poll=1.0):
+        """
+        Tries to take the lease, waiting up to timeout seconds (None waits
+        indefinitely). Returns True if it is now held by this process.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._try_create():
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+                self._heartbeat.start()
+                return True
+            self._break_if_stale()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+
+    def release(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        if self.holder() == self.token:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def holder(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def is_held(self):
+        """
+        True if some live process (this one included) holds the lease.
+        """
+        version = file_version(self.path)
+        return version is not None and not self._expired(version)
+
+    def wait(self, timeout=None, poll=1.0):
+        """
+        Waits until no process holds the lease. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_held():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def _try_create(self):
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.token)
+        return True
+
+    def _expired(self, version):
+        return time.time() - version[0] / 1e9 > self.lease
+
+    def _break_if_stale(self):
+        try:
+            seen = os.stat(self.path)
+        except OSError:
+            return
+        if not self._expired((seen.st_mtime_ns, seen.st_size)):
+            return
+        # Move the lock aside, then make sure what was moved is the stale
+        # file we looked at: another process may have broken it and created
+        # a fresh lock between our stat() and rename().
+        stale = f"{self.path}.{self.token}.stale"
+        try:
+            os.rename(self.path, stale)
+            moved = os.stat(stale)
+        except OSError:
+            return
+        if (moved.st_ino, moved.st_mtime_ns, moved.st_size) != (
+            seen.st_ino,
+            seen.st_mtime_ns,
+            seen.st_size,
+        ):
+            self._restore(stale)
+            return
+        print(f"Took over a stale sync lease on {self.path}")
+        os.remove(stale)
+
+    def _restore(self, moved):
+        """
+        Puts back a live lock file moved aside by mistake, without replacing
+        a lock created in the meantime.
+        """
+        try:
+            os.link(moved, self.path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hard links on this filesystem; rename does not overwrite
+            # on Windows, so check first elsewhere.
+            if not os.path.exists(self.path):
+                try:
+                    os.rename(moved, self.path)
+                except OSError:
+                    pass
+        if os.path.exists(moved):
+            os.remove(moved)
+
+    def _renew(self):
+        while not self._stop.wait(self.lease / 3):
+            # Stop refreshing a lock that no longer belongs to this process.
+            if self.holder() != self.token:
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def __enter__(self):
+        self.acquire(timeout=None)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class RequesterDirectory:
+    """
+    In-memory index over the cached requesters file. The file is parsed
+    once and lookups by email, id or name are dictionary hits instead of a
+    scan of the whole directory. Indexes are swapped atomically, so lookups
+    from the UI thread are safe while a sync replaces them.
+    """
+
+    def __init__(self, path="requesters.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        # Serialises loads so concurrent first lookups parse the file once
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._by_email = {}
+        self._by_id = {}
+        self._by_name = {}
+        self._search_index = None
+        # Bumped by every replace(); an index built from older dicts is dropped
+        self._generation = 0
+        # file_version of the file the indexes were built from
+        self.version = None
+
+    def load(self):
+        """
+        (Re)reads the requesters file and rebuilds the indexes. A missing
+        file leaves the directory empty.
+        """
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        self.version = file_version(self.path)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                requesters = json.load(f).get("requesters", [])
+        except FileNotFoundError:
+            requesters = []
+        self.replace(requesters)
+
+    def replace(self, requesters):
+        """
+        Rebuilds the indexes from a list of requester dicts.
+        """
+        by_email, by_id, by_name = {}, {}, {}
+        for requester in requesters:
+            email = requester.get("email")
+            if email:
+                by_email[email.lower()] = requester
+            if requester.get("id") is not None:
+                by_id[requester["id"]] = requester
+            name = _full_name(requester)
+            if name:
+                by_name.setdefault(name, []).append(requester)
+        with self._lock:
+            self._by_email, self._by_id, self._by_name = by_email, by_id, by_name
+            self._search_index = None
+            self._generation += 1
+            self._loaded = True
+
+    def reload_if_changed(self):
+        """
+        Reloads the file if another process (or client) has rewritten it
+        since it was loaded, or has appeared since a load found none. Costs
+        one stat() when nothing changed. Returns True if the directory was
+        reloaded.
+        """
+        if file_version(self.path) == self.version:
+            return False
+        self.load()
+        return True
+
+    def invalidate(self):
+        """
+        Marks the directory stale so the next lookup reloads the file.
+        """
+        with self._lock:
+            self._loaded = False
+
+    @property
+    def ready(self):
+        """
+        True once the file is loaded and the search index built, i.e. when
+        lookups and search() return without touching the disk. The UI
+        checks this instead of triggering a load on its own thread.
+        """
+        return self._loaded and self._search_index is not None
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            # Waits for a load already running on another thread
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+
+    def get_by_email(self, email):
+        self._ensure_loaded()
+        return self._by_email.get(email.lower()) if email else None
+
+    def get_by_id(self, requester_id):
+        self._ensure_loaded()
+        return self._by_id.get(requester_id)
+
+    def find_by_name(self, name):
+        """
+        Returns every requester whose "first last" name matches, ignoring case.
+        """
+        self._ensure_loaded()
+        return list(self._by_name.get(" ".join(name.lower().split()), []))
+
+    def _get_search_index(self):
+        self._ensure_loaded()
+        with self._lock:
+            index = self._search_index
+            by_id, generation = self._by_id, self._generation
+        if index is None:
+            # Built outside the lock; only kept if no replace() ran meanwhile,
+            # so a stale index never overwrites the reset for newer data.
+            index = RequesterSearchIndex(by_id.values())
+            with self._lock:
+                if self._generation == generation:
+                    self._search_index = index
+        return index
+
+    def prepare_search(self):
+        """
+        Builds the search indexes ahead of the first query, e.g. from a
+        background thread at startup.
+        """
+        self._get_search_index().prepare()
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        Type-ahead search over names and emails; see RequesterSearchIndex.
+        The index is built on first use after each load. fuzzy=False skips
+        the trigram fallback and returns only exact or prefix matches.
+        """
+        return self._get_search_index().search(query, limit, fuzzy)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._by_id)
+
+
+def _full_name(requester):
+    parts = (requester.get("first_name") or "", requester.get("last_name") or "")
+    return " ".join(" ".join(parts).lower().split())
+
+
+_TOKEN_SPLIT = re.compile(r"[\s.@_'-]+")
+
+
+def _search_tokens(text):
+    return [t for t in _TOKEN_SPLIT.split(text.lower()) if t]
+
+
+def _trigrams(text):
+    text = f"  {' '.join(_search_tokens(text))} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class RequesterSearchIndex:
+    """
+    Type-ahead index over requester names and emails. Every name and email
+    token is kept in one sorted array, so each query token is a binary
+    search for its prefix range; a requester matches when every query token
+    prefixes one of its tokens. When that yields fewer than limit results,
+    a trigram index (built on first need) fills in fuzzy matches for
+    nicknames and typos.
+    """
+
+    def __init__(self, requesters):
+        self.requesters = list(requesters)
+        self._tokens = []
+        self._name_lengths = []
+        entries = []
+        for i, requester in enumerate(self.requesters):
+            name = _full_name(requester)
+            self._name_lengths.append(len(name))
+            tokens = set(_search_tokens(name))
+            email = requester.get("email") or ""
+            tokens.update(_search_tokens(email))
+            if email:
+                tokens.add(email.lower())
+            self._tokens.append(tokens)
+            entries.extend((token, i) for token in tokens)
+        entries.sort()
+        self._keys = [token for token, _ in entries]
+        self._ids = [i for _, i in entries]
+        self._trigram_index = None
+
+    def _prefix_matches(self, token):
+        lo = bisect.bisect_left(self._keys, token)
+        hi = bisect.bisect_left(self._keys, token + "\uffff", lo)
+        return set(self._ids[lo:hi])
+
+    def prepare(self):
+        if self._trigram_index is None:
+            self._build_trigrams()
+
+    def _build_trigrams(self):
+        index = {}
+        sizes = []
+        for i, requester in enumerate(self.requesters):
+            grams = _trigrams(_full_name(requester)) | _trigrams(
+                (requester.get("email") or "").split("@")[0]
+            )
+            sizes.append(len(grams))
+            for gram in grams:
+                index.setdefault(gram, []).append(i)
+        self._trigram_index = (index, sizes)
+
+    def _fuzzy_matches(self, query, exclude, limit, threshold=0.5):
+        self.prepare()
+        index, sizes = self._trigram_index
+        grams = _trigrams(query)
+        counts = {}
+        for gram in grams:
+            for i in index.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        scored = []
+        for i, shared in counts.items():
+            if i in exclude:
+                continue
+            # Rank by how much of the query is covered, then by overall
+            # similarity so tighter matches win ties.
+            coverage = shared / len(grams)
+            if coverage >= threshold:
+                similarity = shared / (len(grams) + sizes[i] - shared)
+                scored.append((-coverage, -similarity, i))
+        return [i for *_, i in heapq.nsmallest(limit, scored)]
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        Returns up to limit requester dicts matching query, best first.
+        """
+        tokens = _search_tokens(query)
+        if not tokens:
+            return []
+
+        matches = None
+        for token in sorted(tokens, key=len, reverse=True):
+            found = self._prefix_matches(token)
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+
+        def rank(i):
+            # Exact token hits first, then shorter names.
+            exact = sum(token in self._tokens[i] for token in tokens)
+            return (-exact, self._name_lengths[i], i)
+
+        ranked = heapq.nsmallest(limit, matches or (), key=rank)
+        if fuzzy and len(ranked) < limit:
+            ranked += self._fuzzy_matches(query, set(ranked), limit - len(ranked))
+        return [self.requesters[i] for i in ranked]
+
+
+class RequesterStore:
+    """
+    Optional SQLite-backed requester cache with on-disk indexes on email,
+    id, name and department. Each sync is applied in a single transaction,
+    so an interrupted sync leaves the previous data intact.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS requesters (
+            id INTEGER PRIMARY KEY,
+            email TEXT COLLATE NOCASE,
+            name TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_requesters_email ON requesters (email);
+        CREATE INDEX IF NOT EXISTS idx_requesters_name ON requesters (name);
+        CREATE TABLE IF NOT EXISTS requester_departments (
+            requester_id INTEGER NOT NULL,
+            department_id INTEGER NOT NULL,
+            PRIMARY KEY (department_id, requester_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_requester_departments_requester
+            ON requester_departments (requester_id);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path="requesters.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _upsert(self, requesters):
+        rows = []
+        departments = []
+        for r in requesters:
+            rows.append((r["id"], r.get("email"), _full_name(r), json.dumps(r)))
+            departments.extend((r["id"], d) for d in r.get("department_ids") or [])
+        self.conn.executemany(
+            "INSERT INTO requesters (id, email, name, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET email=excluded.email, "
+            "name=excluded.name, data=excluded.data",
+            rows,
+        )
+        self.conn.executemany(
+            "DELETE FROM requester_departments WHERE requester_id = ?",
+            [(row[0],) for row in rows],
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO requester_departments VALUES (?, ?)", departments
+        )
+
+    def _delete(self, requester_ids):
+        params = [(i,) for i in requester_ids]
+        self.conn.executemany("DELETE FROM requesters WHERE id = ?", params)
+        self.conn.executemany(
+            "DELETE FROM requester_departments WHERE requester_id = ?", params
+        )
+
+    def replace(self, requesters, synced_at=None):
+        """
+        Replaces the whole store with the result of a full sync.
+        """
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM requesters")
+            self.conn.execute("DELETE FROM requester_departments")
+            self._upsert(requesters)
+            self._set_meta("synced_at", synced_at)
+
+    def apply_changes(self, upserts=(), removed_ids=(), synced_at=None):
+        """
+        Applies the result of an incremental sync.
+        """
+        with self._lock, self.conn:
+            self._upsert(upserts)
+            self._delete(removed_ids)
+            self._set_meta("synced_at", synced_at)
+
+    def _set_meta(self, key, value):
+        if value is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row["value"] if row else None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_by_email(self, email):
+        rows = self._query("SELECT data FROM requesters WHERE email = ?", (email,))
+        return rows[0] if rows else None
+
+    def get_by_id(self, requester_id):
+        rows = self._query("SELECT data FROM requesters WHERE id = ?", (requester_id,))
+        return rows[0] if rows else None
+
+    def search_name(self, prefix, limit=20):
+        """
+        Returns requesters whose "first last" name starts with prefix.
+        """
+        prefix = " ".join(prefix.lower().split())
+        # Range scan instead of LIKE so the name index is used.
+        return self._query(
+            "SELECT data FROM requesters WHERE name >= ? AND name < ? "
+            "ORDER BY name LIMIT ?",
+            (prefix, prefix + "\uffff", limit),
+        )
+
+    def by_department(self, department_id):
+        return self._query(
+            "SELECT r.data FROM requester_departments d "
+            "JOIN requesters r ON r.id = d.requester_id "
+            "WHERE d.department_id = ? ORDER BY r.name",
+            (department_id,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM requesters").fetchone()[0]
+
+
+@dataclass
+class TicketResult:
+    """
+    Outcome of one ticket in a create_tickets batch.
+    """
+
+    index: int
+    ticket_id: int | None
+    status_code: int | None
+    error: object
+    latency: float
+
+    @property
+    def ok(self):
+        return self.ticket_id is not None
+
+
+TICKET_FIELDS = (
+    "subject",
+    "description",
+    "email",
+    "category",
+    "priority",
+    "status",
+    "type",
+    "requester_id",
+    "responder_id",
+    "group_id",
+    "location",
+)
+INTEGER_TICKET_FIELDS = {"priority", "status", "requester_id", "responder_id", "group_id"}
+
+
+def load_ticket_specs(path):
+    """
+    Reads ticket specs for create_tickets from a .csv or .json file.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        specs = []
+        for row in rows:
+            # Rows naming a template keep every column as a template input.
+            fields = row if (row.get("template") or "").strip() else TICKET_FIELDS
+            spec = {}
+            for field in fields:
+                value = (row.get(field) or "").strip()
+                if not value:
+                    continue
+                # Anything else (e.g. a group name or "High") is kept as
+                # text and checked per ticket by create_tickets.
+                if field in INTEGER_TICKET_FIELDS and value.isdigit():
+                    value = int(value)
+                spec[field] = value
+            # Attachment paths are ";"-separated, relative to the CSV file.
+            attachments = [a.strip() for a in (row.get("attachments") or "").split(";")]
+            if any(attachments):
+                base = os.path.dirname(os.path.abspath(path))
+                spec["attachments"] = [os.path.join(base, a) for a in attachments if a]
+            specs.append(spec)
+        return specs
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("tickets", [])
+    return data
+
+
+def _form_fields(payload, prefix=None):
+    """
+    Flattens a JSON ticket body into multipart form fields, using the
+    field[key] and field[] names Freshservice expects for nested values.
+    """
+    fields = []
+    for key, value in payload.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            fields.extend(_form_fields(value, name))
+        elif isinstance(value, (list, tuple)):
+            fields.extend((f"{name}[]", str(item)) for item in value)
+        elif isinstance(value, bool):
+            fields.append((name, "true" if value else "false"))
+        else:
+            fields.append((name, str(value)))
+    return fields
+
+
+class MultipartBody:
+    """
+    multipart/form-data request body that streams attachments from disk in
+    chunks instead of reading them into memory. Its length is known up
+    front, so it is sent with a Content-Length rather than chunked, and it
+    can be iterated again, reopening the files, when a request is retried.
+    files are paths or (filename, path) pairs (tuples or 2-item lists).
+    """
+
+    def __init__(self, fields, files, field_name="attachments[]", chunk_size=64 * 1024):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts = []
+        for name, value in fields:
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+            ).encode()
+            self.parts.append((header, value.encode(), None, None))
+        for item in files:
+            filename, path = _attachment(item)
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(field_name)}"; '
+                f'filename="{_quote(filename)}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            ).encode()
+            self.parts.append((header, None, path, os.path.getsize(path)))
+        self.closing = f"--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def file_bytes(self):
+        return sum(size for _, _, _, size in self.parts if size is not None)
+
+    def __len__(self):
+        return (
+            sum(
+                len(header) + (len(value) if value is not None else size) + 2
+                for header, value, _, size in self.parts
+            )
+            + len(self.closing)
+        )
+
+    def __iter__(self):
+        for header, value, path, size in self.parts:
+            yield header
+            if value is not None:
+                yield value
+            else:
+                sent = 0
+                with open(path, "rb") as f:
+                    while chunk := f.read(self.chunk_size):
+                        sent += len(chunk)
+                        yield chunk
+                if sent != size:
+                    raise ValueError(f"{path} changed size during upload")
+            yield b"\r\n"
+        yield self.closing
+
+
+def _attachment(item):
+    """
+    Returns (filename, path) for an attachment given as a path or as a
+    (filename, path) pair; pairs may be lists, as they come back from JSON.
+    """
+    if isinstance(item, (tuple, list)) and len(item) == 2:
+        return item[0], item[1]
+    return os.path.basename(item), item
+
+
+def _quote(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "")
+
+
+def check_attachments(files, limit=MAX_ATTACHMENT_BYTES):
+    """
+    Raises ValueError if the attachments add up to more than limit bytes,
+    and FileNotFoundError if one is missing, before anything is uploaded.
+    """
+    paths = [_attachment(item)[1] for item in files]
+    total = sum(os.path.getsize(path) for path in paths)
+    if total > limit:
+        raise ValueError(
+            f"Attachments total {total / 1048576:.1f} MB, over the "
+            f"{limit / 1048576:.0f} MB limit"
+        )
+    return total
+
+
+def _ticket_number(name, value):
+    """
+    Accepts an integer ticket field given as a number or digit string;
+    raises ValueError for anything else so the ticket fails locally.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError(f"{name} must be a number, got {value!r}")
+
+
+class TicketOutbox:
+    """
+    Durable SQLite outbox for ticket creation. Submissions are written to
+    disk first and delivered later by drain() or a background worker, so
+    tickets survive network outages and restarts. Each item carries an
+    idempotency key: enqueuing the same key twice is a no-op, and after an
+    ambiguous failure (the request may have reached Freshservice) the
+    requester's recent tickets are checked before posting again. Several
+    processes may share one outbox file: each item is claimed atomically
+    before it is sent, and the claim expires after lease seconds so items
+    held by a process that died are picked up again.
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            spec TEXT NOT NULL,
+            meta TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            ticket_id INTEGER,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+    """
+
+    def __init__(self, path="outbox.db", max_attempts=10, lease=600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        self._release_expired()
+
+    def _release_expired(self):
+        # A "sending" item's next_attempt_at is its claim expiry. Past it, the
+        # claiming process is gone and the ticket may or may not exist.
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, next_attempt_at = 0 "
+                "WHERE status = ? AND next_attempt_at <= ?",
+                (self.PENDING, "ambiguous: interrupted", self.SENDING, time.time()),
+            )
+
+    def close(self):
+        self.stop_worker()
+        self.conn.close()
+
+    def enqueue(self, spec, meta=None, idempotency_key=None):
+        """
+        Persists a ticket spec (create_ticket keyword arguments) and returns
+        its idempotency key. meta is stored alongside and handed back to the
+        delivery callbacks.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(idempotency_key, spec, meta, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(spec),
+                    json.dumps(meta),
+                    self.PENDING,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        self._wake.set()
+        return key
+
+    def _rows(self, sql, params=()):
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        items = []
+        for row in rows:
+            item = dict(row)
+            item["spec"] = json.loads(item["spec"])
+            item["meta"] = json.loads(item["meta"]) if item["meta"] else None
+            items.append(item)
+        return items
+
+    def pending(self):
+        """
+        Returns items waiting to be delivered, oldest first.
+        """
+        return self._rows(
+            "SELECT * FROM outbox WHERE status IN (?, ?) ORDER BY id",
+            (self.PENDING, self.SENDING),
+        )
+
+    def failed(self):
+        """
+        Returns items that exhausted their retries or were rejected.
+        """
+        return self._rows(
+            "SELECT * FROM outbox WHERE status = ? ORDER BY id", (self.FAILED,)
+        )
+
+    def get(self, idempotency_key):
+        items = self._rows(
+            "SELECT * FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+        )
+        return items[0] if items else None
+
+    def replay(self, idempotency_key=None):
+        """
+        Requeues one failed item, or every failed item if no key is given.
+        Returns the number of items requeued.
+        """
+        sql = (
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0 "
+            "WHERE status = ?"
+        )
+        params = [self.PENDING, self.FAILED]
+        if idempotency_key:
+            sql += " AND idempotency_key = ?"
+            params.append(idempotency_key)
+        with self._lock, self.conn:
+            count = self.conn.execute(sql, params).rowcount
+        self._wake.set()
+        return count
+
+    def _update(self, item_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"UPDATE outbox SET {columns} WHERE id = ?", (*fields.values(), item_id)
+            )
+
+    def drain(self, api, limit=None, on_delivered=None, on_failed=None):
+        """
+        Delivers every due item through api. on_delivered(item, ticket_id)
+        and on_failed(item, error) are called as items settle. Returns the
+        number of items delivered.
+        """
+        self._release_expired()
+        due = self._rows(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+            "ORDER BY id" + (" LIMIT ?" if limit else ""),
+            (self.PENDING, time.time(), limit) if limit else (self.PENDING, time.time()),
+        )
+        delivered = 0
+        for item in due:
+            ticket_id = self._deliver(api, item, on_failed)
+            if ticket_id is not None:
+                delivered += 1
+                if on_delivered:
+                    on_delivered(item, ticket_id)
+        return delivered
+
+    def _claim(self, item):
+        """
+        Marks a due item as being sent by this process and returns it as
+        stored, or None if another process claimed or settled it first.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            claimed = self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ? "
+                "WHERE id = ? AND status = ? AND next_attempt_at <= ?",
+                (self.SENDING, now + self.lease, item["id"], self.PENDING, now),
+            ).rowcount
+        return self.get(item["idempotency_key"]) if claimed else None
+
+    def _deliver(self, api, item, on_failed):
+        # Re-read on claim: another process may have recorded an ambiguous
+        # failure since this item was selected.
+        item = self._claim(item)
+        if item is None:
+            return None
+        attempts = item["attempts"]
+        # A previous attempt may have created the ticket before failing.
+        if item["last_error"] and item["last_error"].startswith("ambiguous"):
+            try:
+                ticket_id = api.find_recent_ticket(item["spec"], item["created_at"])
+            except requests.RequestException as e:
+                # Still unknown; keep the "ambiguous" prefix so the lookup is
+                # repeated before the next send.
+                return self._retry_later(
+                    item, attempts, f"ambiguous: lookup failed: {e}", on_failed
+                )
+            if ticket_id is not None:
+                self._mark_sent(item, ticket_id)
+                return ticket_id
+
+        try:
+            spec = dict(item["spec"])
+            attachments = spec.pop("attachments", None)
+            body, size = api._ticket_body(api._build_ticket_payload(**spec), attachments)
+        except (TypeError, ValueError, OSError) as e:
+            return self._reject(item, f"invalid ticket: {e}", on_failed)
+        except requests.RequestException as e:
+            # Resolving names to ids needed reference data that failed to load.
+            return self._retry_later(item, attempts, f"lookup failed: {e}", on_failed)
+
+        try:
+            with api._upload_slot(size):
+                response = api._request("POST", api._build_url("tickets"), **body)
+        except requests.ConnectTimeout as e:
+            return self._retry_later(item, attempts, f"connect failed: {e}", on_failed)
+        except requests.RequestException as e:
+            return self._retry_later(item, attempts, f"ambiguous: {e}", on_failed)
+
+        if response.status_code == 201:
+            ticket_id = response.json().get("ticket", {}).get("id")
+            self._mark_sent(item, ticket_id)
+            return ticket_id
+        error = f"HTTP {response.status_code}: {response.text[:500]}"
+        if response.status_code == 429:
+            return self._retry_later(item, attempts, error, on_failed)
+        if response.status_code in RETRY_STATUSES:
+            # A 5xx (504 especially) can arrive after the ticket was created.
+            return self._retry_later(item, attempts, f"ambiguous: {error}", on_failed)
+        # Any other 4xx will fail the same way every time.
+        return self._reject(item, error, on_failed)
+
+    def _reject(self, item, error, on_failed):
+        self._update(item["id"], status=self.FAILED, last_error=error)
+        print(f"Outbox item {item['idempotency_key']} rejected: {error}")
+        if on_failed:
+            on_failed(item, error)
+        return None
+
+    def _mark_sent(self, item, ticket_id):
+        self._update(
+            item["id"],
+            status=self.SENT,
+            ticket_id=ticket_id,
+            last_error=None,
+            sent_at=datetime.now(timezone.utc).isoformat(),
+        )
+        print(f"Outbox item {item['idempotency_key']} delivered as ticket {ticket_id}")
+
+    def _retry_later(self, item, attempts, error, on_failed):
+        if attempts >= self.max_attempts:
+            self._update(item["id"], status=self.FAILED, attempts=attempts, last_error=error)
+            print(f"Outbox item {item['idempotency_key']} failed: {error}")
+            if on_failed:
+                on_failed(item, error)
+            return None
+        delay = backoff_delay(attempts, base=2.0, cap=300.0)
+        self._update(
+            item["id"],
+            status=self.PENDING,
+            attempts=attempts,
+            last_error=error,
+            next_attempt_at=time.time() + delay,
+        )
+        logger.debug(
+            "Outbox item %s retry in %.0fs: %s", item["idempotency_key"], delay, error
+        )
+        return None
+
+    def start_worker(self, api, interval=5.0, on_delivered=None, on_failed=None):
+        """
+        Starts a daemon thread that drains the outbox whenever an item is
+        enqueued and at least every interval seconds.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def worker():
+            while not self._stop.is_set():
+                try:
+                    self.drain(api, on_delivered=on_delivered, on_failed=on_failed)
+                except Exception as e:
+                    print(f"Outbox worker error: {e}")
+                self._wake.wait(interval)
+                self._wake.clear()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=worker, daemon=True)
+        self._thread.start()
+
+    def stop_worker(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+@dataclass
+class CachedEntry:
+    body: bytes
+    headers: dict
+    stored_at: float
+
+    def age(self):
+        return time.time() - self.stored_at
+
+    def to_response(self, url):
+        """
+        Rebuilds a requests.Response so callers cannot tell a cache hit from
+        a network response.
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.body
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = url
+        response.encoding = "utf-8"
+        return response
+
+
+def cache_key(url, params=None):
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+class ResponseCache:
+    """
+    Cache for GET responses: an in-memory LRU with a TTL, plus an optional
+    SQLite tier (path) that survives restarts. Entries past their TTL are
+    kept so that, when they carry an ETag or Last-Modified, the client can
+    revalidate them with a conditional request instead of a full refetch.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            headers TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+
+    def get(self, key):
+        """
+        Returns the entry for key, fresh or stale, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            if self.conn is None:
+                return None
+            row = self.conn.execute(
+                "SELECT body, headers, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = CachedEntry(row[0], json.loads(row[1]), row[2])
+            self._remember(key, entry)
+            return entry
+
+    def put(self, key, response):
+        # Only the validators and content headers are worth keeping.
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() in ("etag", "last-modified", "content-type")
+        }
+        entry = CachedEntry(response.content, headers, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                        (key, entry.body, json.dumps(headers), entry.stored_at),
+                    )
+
+    def touch(self, key):
+        """
+        Marks an entry fresh again after a 304 Not Modified.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.stored_at = time.time()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "UPDATE responses SET stored_at = ? WHERE key = ?",
+                        (entry.stored_at, key),
+                    )
+
+    def invalidate(self, prefix=""):
+        """
+        Drops every entry whose key starts with prefix (all by default).
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "DELETE FROM responses WHERE substr(key, 1, ?) = ?",
+                        (len(prefix), prefix),
+                    )
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class ReferenceData:
+    """
+    Groups, agents, departments, locations and ticket field choices,
+    fetched in one concurrent warm-up pass and optionally refreshed on a
+    background thread. Names (and agent emails) resolve to ids locally, so
+    building a ticket never needs an extra lookup request.
+    """
+
+    COLLECTIONS = ("groups", "agents", "departments", "locations")
+
+    def __init__(self, api):
+        self.api = api
+        self._lock = threading.Lock()
+        self._items = {}
+        self._ids = {}
+        self._choices = {}
+        self.loaded_at = None
+        # Serialises the first load so concurrent lookups fetch once
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Fetches every collection and the ticket form fields concurrently and
+        swaps them in at once.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.COLLECTIONS) + 1) as pool:
+            futures = {
+                name: pool.submit(lambda n: list(self.api.iter_collection(n, n)), name)
+                for name in self.COLLECTIONS
+            }
+            fields_future = pool.submit(self.api.get, "ticket_form_fields")
+            items = {name: future.result() for name, future in futures.items()}
+            form_fields = (fields_future.result() or {}).get("ticket_fields", [])
+
+        ids = {}
+        for name, records in items.items():
+            index = {}
+            for record in records:
+                for key in self._names(name, record):
+                    index.setdefault(key, record.get("id"))
+            ids[name] = index
+        choices = {
+            field.get("name"): _choice_values(field.get("choices"))
+            for field in form_fields
+            if field.get("choices")
+        }
+
+        with self._lock:
+            self._items, self._ids, self._choices = items, ids, choices
+            self.loaded_at = time.time()
+        logger.debug(
+            "Reference data loaded: %s",
+            ", ".join(f"{len(v)} {k}" for k, v in items.items()),
+        )
+
+    @staticmethod
+    def _names(collection, record):
+        if collection == "agents":
+            names = [_full_name(record), (record.get("email") or "").lower()]
+        else:
+            names = [(record.get("name") or "").lower()]
+        return [name for name in names if name]
+
+    def _ensure_loaded(self):
+        if self.loaded_at is None:
+            # Waits for a load already running on another thread
+            with self._load_lock:
+                if self.loaded_at is None:
+                    self.refresh()
+
+    def start_refresh(self, interval=1800, callback=None):
+        """
+        Refreshes the reference data every interval seconds on a daemon
+        thread; the first refresh happens immediately. callback(self) runs
+        on that thread after each successful refresh.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def worker():
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Failed to refresh reference data: {e}")
+                else:
+                    if callback:
+                        try:
+                            callback(self)
+                        except Exception as e:
+                            print(f"Reference data callback failed: {e}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=worker, daemon=True)
+        self._thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+
+    def resolve(self, collection, name):
+        """
+        Returns the id for a name in a collection. Raises ValueError for
+        unknown names so a bad payload is caught before it is sent.
+        """
+        self._ensure_loaded()
+        key = " ".join(str(name).lower().split())
+        record_id = self._ids.get(collection, {}).get(key)
+        if record_id is None:
+            raise ValueError(f"Unknown {collection[:-1]}: {name}")
+        return record_id
+
+    def group_id(self, name):
+        return self.resolve("groups", name)
+
+    def agent_id(self, name_or_email):
+        return self.resolve("agents", name_or_email)
+
+    def department_id(self, name):
+        return self.resolve("departments", name)
+
+    def location_id(self, name):
+        return self.resolve("locations", name)
+
+    def all(self, collection):
+        self._ensure_loaded()
+        return list(self._items.get(collection, []))
+
+    def choices(self, field_name):
+        """
+        Returns the top-level choice values of a ticket form field.
+        """
+        self._ensure_loaded()
+        return list(self._choices.get(field_name, []))
+
+
+def _choice_values(choices):
+    # Form field choices come back either as a list of {"value": ...}
+    # dicts or as a plain list/dict of values.
+    if isinstance(choices, dict):
+        return list(choices)
+    values = []
+    for choice in choices:
+        values.append(choice.get("value") if isinstance(choice, dict) else choice)
+    return values
+
+
+@dataclass
+class HealthStatus:
+    """
+    Outcome of one health probe. authenticated is None when the API could
+    not be reached.
+    """
+
+    available: bool
+    authenticated: bool | None
+    latency: float | None
+    status_code: int | None
+    error: str | None
+    checked_at: float
+
+
+class HealthMonitor:
+    """
+    Lightweight probe of the Freshservice API: a one-item requester list
+    request that checks reachability and the API key and, run periodically,
+    keeps a pooled connection warm. The latest result is in status;
+    availability() and latency() summarise the recent probes.
+    """
+
+    def __init__(self, api, timeout=(3.05, 10), history=20):
+        self.api = api
+        self.timeout = timeout
+        self.status = None
+        self.history = deque(maxlen=history)
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self):
+        """
+        Sends one probe request (never retried) and returns a HealthStatus.
+        """
+        url = self.api.requesters_api_url
+        event = RequestEvent("GET", endpoint_label(url), None, 0.0, url=url)
+        started = time.perf_counter()
+        try:
+            self.api.rate_limiter.acquire()
+            response = self.api.session.get(
+                url, params={"per_page": 1}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            event.error = type(e).__name__
+            status = HealthStatus(False, None, None, None, str(e), time.time())
+        else:
+            self.api.rate_limiter.update(response)
+            event.status = code = response.status_code
+            latency = response.elapsed.total_seconds()
+            status = HealthStatus(
+                available=code < 500,
+                authenticated=code != 401 if code < 500 else None,
+                latency=latency,
+                status_code=code,
+                error=None if code < 400 else response.reason,
+                checked_at=time.time(),
+            )
+            if code == 401:
+                print("Freshservice rejected the API key (401). Check API_KEY.")
+        finally:
+            event.latency = time.perf_counter() - started
+            self.api.metrics.record(event)
+        self.status = status
+        self.history.append(status)
+        return status
+
+    def probe_in_background(self):
+        """
+        Starts a probe on a daemon thread, so that DNS, TCP and TLS setup and
+        the credential check overlap with application startup.
+        """
+        self._pending = threading.Thread(target=self._safe_probe, daemon=True)
+        self._pending.start()
+        return self._pending
+
+    def _safe_probe(self):
+        try:
+            return self.probe()
+        except Exception as e:
+            print(f"Health probe failed: {e}")
+            return None
+
+    def availability(self):
+        """
+        Fraction of recent probes that reached the API, or None before the
+        first probe.
+        """
+        if not self.history:
+            return None
+        return sum(1 for s in self.history if s.available) / len(self.history)
+
+    def latency(self):
+        """
+        Median latency in seconds of recent successful probes.
+        """
+        latencies = sorted(s.latency for s in self.history if s.latency is not None)
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def start(self, interval=120, callback=None):
+        """
+        Probes every interval seconds on a daemon thread, calling
+        callback(status) after each probe. A warm-up probe still in flight
+        is reused as the first result.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def worker():
+            pending = self._pending
+            if pending is not None:
+                pending.join()
+                self._pending = None
+                status = self.status
+            else:
+                status = self._safe_probe()
+            while True:
+                if callback and status is not None:
+                    try:
+                        callback(status)
+                    except Exception as e:
+                        print(f"Health callback failed: {e}")
+                if self._stop.wait(interval):
+                    return
+                status = self._safe_probe()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
 
 class FreshServiceAPI:
-    def __init__(self, ticket_api_url, requesters_api_url, api_key):
+    def __init__(
+        self,
+        ticket_api_url,
+        requesters_api_url,
+        api_key,
+        pool_size=10,
+        timeout=DEFAULT_TIMEOUT,
+        rate_limit=DEFAULT_RATE_LIMIT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        rate_limiter=None,
+        store=None,
+        requester_fields=REQUESTER_FIELDS,
+        cache=None,
+        metrics=None,
+        warm_up=False,
+        templates=None,
+        max_attachment_bytes=MAX_ATTACHMENT_BYTES,
+        upload_bytes_in_flight=UPLOAD_BYTES_IN_FLIGHT,
+    ):
         self.ticket_api_url = ticket_api_url
         self.requesters_api_url = requesters_api_url
         self.api_key = API_KEY
@@ -24,6 +1641,205 @@ class FreshServiceAPI:
             "Authorization": f"Basic {self.encoded_api_key}",
             "Content-Type": "application/json",
         }
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Pass a shared RateLimiter to have several clients share one quota.
+        self.rate_limiter = rate_limiter or RateLimiter(rate_limit)
+        self.session = self._build_session(pool_size)
+        self.directory = RequesterDirectory()
+        # Optional RequesterStore kept in step with every requester sync
+        self.store = store
+        # Pass requester_fields=None to keep every field the API returns
+        self.requester_fields = requester_fields
+        # Optional ResponseCache used by get() and use_cache=True reads
+        self.cache = cache
+        # Per-request counters and latency histograms; pass a shared Metrics
+        # to aggregate several clients.
+        self.metrics = metrics or Metrics()
+        # Optional TicketTemplates used to render bulk specs naming a template
+        self.templates = templates
+        self.max_attachment_bytes = max_attachment_bytes
+        # Caps attachment bytes being uploaded at once across threads, so a
+        # bulk run with large files does not saturate the uplink.
+        self.upload_bytes_in_flight = upload_bytes_in_flight
+        self._uploading = 0
+        self._upload_done = threading.Condition()
+        self.reference = ReferenceData(self)
+        self.health = HealthMonitor(self)
+        # Read once rather than on every ticket
+        self.location = os.getenv("LOCATION")
+        self.site = os.getenv("SITE", "Garrison GSN")
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self):
+        """
+        Opens a pooled connection and validates the API key in the
+        background, so the first real request does not pay for DNS, TCP,
+        TLS and authentication. The result lands in self.health.status.
+        """
+        return self.health.probe_in_background()
+
+    def _build_session(self, pool_size):
+        """
+        Builds the pooled keep-alive session shared by every endpoint.
+        The connection pool is thread-safe, so the worker thread in
+        update_requester_file reuses the same connections as the UI.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        session.headers.update(
+            {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        )
+        return session
+
+    def _request(self, method, url, **kwargs):
+        """
+        Sends a request through the pooled session with the default timeout.
+        Every attempt waits on the shared rate limiter. A 429 is always
+        retried after Retry-After since the request was never processed;
+        idempotent requests are also retried on 5xx and connection errors
+        with jittered exponential backoff. Each call, retries included, is
+        recorded in self.metrics as one RequestEvent.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if self.cache is not None and method.upper() != "GET":
+            # A write may change anything cached under the same resource.
+            self.cache.invalidate(url)
+        event = RequestEvent(method.upper(), endpoint_label(url), None, 0.0, url=url)
+        started = time.perf_counter()
+        try:
+            response = self._send_with_retries(method, url, idempotent, event, kwargs)
+        except requests.RequestException as e:
+            event.error = type(e).__name__
+            raise
+        finally:
+            event.latency = time.perf_counter() - started
+            self.metrics.record(event)
+        return response
+
+    def _send_with_retries(self, method, url, idempotent, event, kwargs):
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            self.rate_limiter.acquire()
+            event.wait += time.perf_counter() - waited
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.debug("%s %s failed (%s), retrying in %.1fs", method, url, e, delay)
+            else:
+                self.rate_limiter.update(response)
+                status = response.status_code
+                event.status = status
+                body = response.request.body
+                if isinstance(body, (bytes, str, MultipartBody)):
+                    event.bytes_sent += len(body)
+                if status == 429:
+                    # The limiter already pauses every caller until Retry-After.
+                    event.throttled += 1
+                    delay = 0.0
+                elif idempotent:
+                    delay = backoff_delay(attempt)
+                else:
+                    delay = None
+                if (
+                    attempt >= self.max_retries
+                    or status not in RETRY_STATUSES
+                    or delay is None
+                ):
+                    if not kwargs.get("stream"):
+                        event.bytes_received = len(response.content)
+                    return response
+                logger.debug("%s %s returned %s, retrying", method, url, status)
+            time.sleep(delay)
+            attempt += 1
+            event.retries = attempt
+
+    def _cached_get(self, url, params=None, ttl=None):
+        """
+        GET through the response cache. Fresh entries are returned without
+        touching the network; stale ones with an ETag or Last-Modified are
+        revalidated with a conditional request, and a 304 reuses the cached
+        body.
+        """
+        if self.cache is None:
+            return self._request("GET", url, params=params)
+
+        ttl = self.cache.ttl if ttl is None else ttl
+        key = cache_key(url, params)
+        entry = self.cache.get(key)
+        if entry is not None and entry.age() < ttl:
+            self.metrics.increment("cache_hits", endpoint=endpoint_label(url))
+            return entry.to_response(url)
+
+        headers = {}
+        if entry is not None:
+            if "ETag" in entry.headers:
+                headers["If-None-Match"] = entry.headers["ETag"]
+            if "Last-Modified" in entry.headers:
+                headers["If-Modified-Since"] = entry.headers["Last-Modified"]
+        response = self._request("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.metrics.increment("cache_revalidations", endpoint=endpoint_label(url))
+            self.cache.touch(key)
+            return entry.to_response(url)
+        if response.status_code == 200:
+            self.cache.put(key, response)
+        return response
+
+    def get(self, endpoint, params=None, ttl=None):
+        """
+        Reads any API endpoint, going through the response cache when one is
+        configured. Returns the parsed JSON, or None on failure.
+        """
+        response = self._cached_get(self._build_url(endpoint), params, ttl)
+        if response.status_code == 200:
+            return response.json()
+        print(f"Failed to fetch {endpoint}: {response.status_code}")
+        return None
+
+    def warm_reference_data(self, refresh_interval=None):
+        """
+        Loads groups, agents, departments, locations and ticket field choices
+        in one pass. With refresh_interval (seconds) they are kept up to date
+        on a background thread instead.
+        """
+        if refresh_interval:
+            self.reference.start_refresh(refresh_interval)
+        else:
+            self.reference.refresh()
+        return self.reference
+
+    def get_requester(self, requester_id):
+        data = self.get(f"requesters/{requester_id}")
+        return data.get("requester") if data else None
+
+    def get_ticket(self, ticket_id):
+        data = self.get(f"tickets/{ticket_id}")
+        return data.get("ticket") if data else None
+
+    def close(self):
+        """
+        Closes the pooled session and releases its connections.
+        """
+        self.health.stop()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _build_url(self, endpoint):
         """
@@ -32,7 +1848,43 @@ class FreshServiceAPI:
 
         return f"{self.ticket_api_url}/{endpoint.lstrip('/')}"
 
-    def create_ticket(
+    def _ticket_body(self, payload, attachments=None):
+        """
+        Returns the request keyword arguments for a ticket or reply body and
+        the attachment bytes it uploads: plain JSON without attachments,
+        otherwise a streamed multipart body. Attachment sizes are checked
+        first, so an oversized upload never reaches the API.
+        """
+        if not attachments:
+            return {"json": payload}, 0
+        check_attachments(attachments, self.max_attachment_bytes)
+        body = MultipartBody(_form_fields(payload), attachments)
+        return {"data": body, "headers": {"Content-Type": body.content_type}}, body.file_bytes
+
+    @contextmanager
+    def _upload_slot(self, size):
+        """
+        Waits until size more attachment bytes fit in the upload budget. An
+        upload larger than the whole budget waits for every other one.
+        """
+        size = min(size, self.upload_bytes_in_flight)
+        with self._upload_done:
+            while self._uploading and self._uploading + size > self.upload_bytes_in_flight:
+                self._upload_done.wait()
+            self._uploading += size
+        try:
+            yield
+        finally:
+            with self._upload_done:
+                self._uploading -= size
+                self._upload_done.notify_all()
+
+    def _post(self, endpoint, payload, attachments=None):
+        body, size = self._ticket_body(payload, attachments)
+        with self._upload_slot(size):
+            return self._request("POST", self._build_url(endpoint), **body)
+
+    def _build_ticket_payload(
         self,
         subject,
         description,
@@ -45,27 +1897,81 @@ class FreshServiceAPI:
         responder_id=None,
         group_id=None,
         location=None,
+        custom_fields=None,
     ):
-        url = self._build_url("tickets")
-        response = requests.post(
-            url,
-            headers=self.headers,
-            json={
-                "subject": subject,
-                "description": description,
-                "email": email,
-                "priority": priority,  # 1: Low, 2: Med, 3: High, 4: Urgent
-                "status": status,  # 2:Open, 3:Pending, 4:Resolve, 5:Closed,
-                "type": type,  # Service Request or Incident
-                "requester_id": requester_id,
-                "group_id": group_id,  # Group where the ticket should be assigned.
-                "responder_id": responder_id,  # Who the ticket should be assigned
-                "custom_fields": {
-                    "please_select_the_service": category,
-                    "location": f"{os.getenv("LOCATION")}",
-                    "site": "Garrison GSN"
-                },
+        """
+        Builds the ticket JSON body. group_id and responder_id may also be
+        given as a group name and an agent name or email; they are resolved
+        through the cached reference data. custom_fields are merged over the
+        default service, location and site fields.
+        """
+        if isinstance(group_id, str):
+            group_id = self.reference.group_id(group_id)
+        if isinstance(responder_id, str):
+            responder_id = self.reference.agent_id(responder_id)
+        priority, status, requester_id = (
+            _ticket_number(name, value)
+            for name, value in (
+                ("priority", priority),
+                ("status", status),
+                ("requester_id", requester_id),
+            )
+        )
+        return {
+            "subject": subject,
+            "description": description,
+            "email": email,
+            "priority": priority,  # 1: Low, 2: Med, 3: High, 4: Urgent
+            "status": status,  # 2:Open, 3:Pending, 4:Resolve, 5:Closed,
+            "type": type,  # Service Request or Incident
+            "requester_id": requester_id,
+            "group_id": group_id,  # Group where the ticket should be assigned.
+            "responder_id": responder_id,  # Who the ticket should be assigned
+            "custom_fields": {
+                "please_select_the_service": category,
+                "location": f"{location or self.location}",
+                "site": self.site,
+                **(custom_fields or {}),
             },
+        }
+
+    def create_ticket(
+        self,
+        subject,
+        description,
+        email=None,
+        category=None,
+        priority=None,
+        status=None,
+        type=None,
+        requester_id=None,
+        responder_id=None,
+        group_id=None,
+        location=None,
+        custom_fields=None,
+        attachments=None,
+    ):
+        """
+        Creates one ticket. attachments is a list of file paths (or
+        (filename, path) pairs) streamed from disk with the ticket.
+        """
+        response = self._post(
+            "tickets",
+            self._build_ticket_payload(
+                subject,
+                description,
+                email,
+                category,
+                priority,
+                status,
+                type,
+                requester_id,
+                responder_id,
+                group_id,
+                location,
+                custom_fields,
+            ),
+            attachments,
         )
 
         # Check if the ticket response was good
@@ -80,52 +1986,411 @@ class FreshServiceAPI:
             print(f"Failed to create ticket: {response.status_code}")
             return None
 
-    def get_requesters(
-        self, output_file="requesters.json", per_page=100, max_pages=200, progress_callback=None
-    ):
+    def _create_ticket_result(self, index, spec):
         """
-        Gets all the non-agent requesters from FreshService and formats it
-        in a JSON file.
+        Creates one ticket for create_tickets and never raises.
         """
-        all_requesters = []
-        page = 1
-        while page <= max_pages:
-            url = self._build_url("requesters") + f"?page={page}&per_page={per_page}"
-            print(f"[DEBUG] Fetching: {url}")
+        started = time.perf_counter()
+        try:
+            if self.templates is not None:
+                # Template errors are reported without sending the request.
+                spec = self.templates.render_spec(spec)
+            elif spec.get("template"):
+                from ticket_templates import TemplateError
 
-            # Update progress if callback is provided
-            if progress_callback:
-                progress_text = f"Fetching page {page} of requesters..."
-                progress_callback(progress_text)
-
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                data = response.json()
-                requesters = data.get("requesters", [])
-                if not requesters:
-                    print(f"[DEBUG] No more requesters found on page {page}.")
-                    break
-                all_requesters.extend(requesters)
-                print(
-                    f"[DEBUG] Page {page}: {len(requesters)} requesters fetched. Total so far: {len(all_requesters)}."
+                raise TemplateError(
+                    f"Ticket names template {spec['template']!r} but no templates are loaded"
                 )
-                page += 1
-            else:
-                print(
-                    f"Failed to fetch requesters on page {page}: {response.status_code}"
+            spec = dict(spec)
+            attachments = spec.pop("attachments", None)
+            response = self._post(
+                "tickets", self._build_ticket_payload(**spec), attachments
+            )
+        except Exception as e:
+            return TicketResult(
+                index, None, None, str(e), time.perf_counter() - started
+            )
+        latency = time.perf_counter() - started
+        if response.status_code == 201:
+            ticket = response.json().get("ticket", {})
+            return TicketResult(index, ticket.get("id"), 201, None, latency)
+        try:
+            error = response.json()
+        except ValueError:
+            error = response.text
+        return TicketResult(index, None, response.status_code, error, latency)
+
+    def create_tickets(self, tickets, max_workers=4):
+        """
+        Creates many tickets concurrently. Each ticket is a dict of
+        create_ticket keyword arguments, or of template inputs with the
+        template name under "template" when the client has templates. All
+        requests share the client's rate limiter. Returns one TicketResult
+        per ticket, in input order.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(
+                    lambda item: self._create_ticket_result(*item), enumerate(tickets)
                 )
-                try:
-                    print("Response", response.json())
-                except Exception:
-                    print("Response content:", response.text)
-                    break
+            )
+        created = sum(1 for r in results if r.ok)
+        print(f"Bulk create: {created} of {len(results)} tickets created.")
+        return results
+
+    def create_tickets_from_file(self, path, max_workers=4):
+        """
+        Creates tickets from a CSV file (one ticket per row, columns named
+        after create_ticket arguments) or a JSON file holding a list of
+        tickets or {"tickets": [...]}.
+        """
+        return self.create_tickets(load_ticket_specs(path), max_workers=max_workers)
+
+    def reply_to_ticket(
+        self, ticket_id, body, attachments=None, cc_emails=None, bcc_emails=None
+    ):
+        """
+        Adds a reply to a ticket, optionally with attachments streamed from
+        disk. Returns the conversation dict, or None on failure.
+        """
+        payload = {"body": body, "cc_emails": cc_emails, "bcc_emails": bcc_emails}
+        response = self._post(f"tickets/{ticket_id}/reply", payload, attachments)
+        if response.status_code == 201:
+            print(f"Reply added to ticket {ticket_id}")
+            return response.json().get("conversation")
+        print(f"Failed to reply to ticket {ticket_id}: {response.status_code}")
+        print(f"Response: {response.text}")
+        return None
+
+    def find_recent_ticket(self, spec, since):
+        """
+        Returns the id of a ticket with the same requester email and subject
+        created since the given ISO timestamp, or None. Used to avoid
+        creating a duplicate after a request whose outcome is unknown. An
+        older ticket with the same subject that was merely updated since
+        does not match. Raises requests.HTTPError if the lookup fails, since
+        "unknown" must not be mistaken for "no ticket".
+        """
+        if not spec.get("email"):
+            return None
+        since = datetime.fromisoformat(since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        response = self._request(
+            "GET",
+            self._build_url("tickets"),
+            params={
+                "email": spec["email"],
+                "updated_since": since.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "per_page": 100,
+            },
+        )
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"Ticket lookup failed: HTTP {response.status_code}", response=response
+            )
+        for ticket in response.json().get("tickets", []):
+            if ticket.get("subject") != spec.get("subject"):
+                continue
+            try:
+                created_at = datetime.fromisoformat(ticket["created_at"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if created_at >= since:
+                return ticket.get("id")
+        return None
+
+    def _fetch_page(
+        self, endpoint, key, page, per_page, params=None, fields=None, use_cache=False
+    ):
+        """
+        Fetches one page of a list endpoint and returns the items under key,
+        keeping only the given fields. Raises requests.HTTPError if the page
+        still fails after retries, so a partial collection is never mistaken
+        for a complete one.
+        """
+        url = self._build_url(endpoint)
+        params = {**(params or {}), "page": page, "per_page": per_page}
+        logger.debug("Fetching: %s %s", url, params)
+        if use_cache:
+            response = self._cached_get(url, params)
+        else:
+            response = self._request("GET", url, params=params)
+        if response.status_code == 200:
+            items = response.json().get(key, [])
+            if fields is not None:
+                items = [
+                    {field: item[field] for field in fields if field in item}
+                    for item in items
+                ]
+            return items
+
+        print(f"Failed to fetch {key} on page {page}: {response.status_code}")
+        try:
+            print("Response", response.json())
+        except Exception:
+            print("Response content:", response.text)
+        response.raise_for_status()
+        return []
+
+    def _fetch_requester_page(self, page, per_page, query=None):
+        """
+        Fetches a single page of requesters, optionally filtered by a
+        Freshservice query string, keeping only requester_fields.
+        """
+        params = {"query": f'"{query}"'} if query else None
+        return self._fetch_page(
+            "requesters", "requesters", page, per_page, params, self.requester_fields
+        )
+
+    def _iter_pages(
+        self,
+        fetch_page,
+        per_page,
+        max_pages,
+        max_workers=1,
+        progress_callback=None,
+        label="requesters",
+    ):
+        """
+        Yields pages (lists of items) in page order until an empty or short
+        page. fetch_page(page, per_page) returns one page. Set max_workers
+        above 1 to fetch pages concurrently; max_pages=None means no limit.
+        """
+        max_pages = max_pages or sys.maxsize
+        if max_workers > 1:
+            return self._iter_pages_concurrently(
+                fetch_page, per_page, max_pages, max_workers, progress_callback, label
+            )
+        return self._iter_pages_sequentially(
+            fetch_page, per_page, max_pages, progress_callback, label
+        )
+
+    def _iter_pages_sequentially(
+        self, fetch_page, per_page, max_pages, progress_callback, label
+    ):
+        """
+        Walks the pages one at a time until an empty or short page.
+        """
+        total = 0
+        for page in range(1, max_pages + 1):
+            if progress_callback:
+                progress_callback(f"Fetching page {page} of {label}...")
+
+            items = fetch_page(page, per_page)
+            if not items:
+                logger.debug("No more %s found on page %d.", label, page)
+                return
+            total += len(items)
+            logger.debug(
+                "Page %d: %d %s fetched. Total so far: %d.", page, len(items), label, total
+            )
+            yield items
+            if len(items) < per_page:
+                return
+
+    def _iter_pages_concurrently(
+        self, fetch_page, per_page, max_pages, max_workers, progress_callback, label
+    ):
+        """
+        Fetches pages through a bounded thread pool, keeping at most
+        max_workers requests in flight. The collection size is not known up
+        front, so pages are probed ahead and the end is discovered from the
+        first empty or short page. Pages are yielded in page order as soon
+        as every earlier page has arrived; no more than 2 * max_workers
+        pages are held in memory at once.
+        """
+        pages = {}
+        last_page = max_pages
+        next_page = 1
+        next_yield = 1
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+            def fill():
+                nonlocal next_page
+                while (
+                    next_page <= last_page
+                    and len(in_flight) < max_workers
+                    and next_page - next_yield < 2 * max_workers
+                ):
+                    future = pool.submit(fetch_page, next_page, per_page)
+                    in_flight[future] = next_page
+                    next_page += 1
+
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    items = future.result()
+                    if not items:
+                        last_page = min(last_page, page - 1)
+                        continue
+                    pages[page] = items
+                    if len(items) < per_page:
+                        last_page = min(last_page, page)
+                    if progress_callback:
+                        progress_callback(f"Fetched page {page} of {label}...")
+                    logger.debug("Page %d: %d %s fetched.", page, len(items), label)
+
+                while next_yield <= last_page and next_yield in pages:
+                    yield pages.pop(next_yield)
+                    next_yield += 1
+                fill()
+
+    def iter_requesters(
+        self, per_page=100, max_pages=200, progress_callback=None, max_workers=1
+    ):
+        """
+        Yields requesters one page at a time without holding the whole
+        directory in memory.
+        """
+        for page in self._iter_pages(
+            self._fetch_requester_page,
+            per_page,
+            max_pages,
+            max_workers,
+            progress_callback,
+        ):
+            yield from page
+
+    def iter_collection(
+        self,
+        endpoint,
+        key,
+        params=None,
+        fields=None,
+        per_page=100,
+        max_pages=None,
+        max_workers=1,
+        progress_callback=None,
+        use_cache=False,
+    ):
+        """
+        Lazily yields every item of a paginated list endpoint, e.g.
+        iter_collection("agents", "agents"). params are sent with every page
+        and fields trims each item. With max_workers above 1 the next pages
+        are prefetched concurrently while earlier ones are consumed.
+        use_cache=True reads pages through the response cache.
+        """
+
+        def fetch_page(page, page_size):
+            return self._fetch_page(
+                endpoint, key, page, page_size, params, fields, use_cache
+            )
+
+        for page in self._iter_pages(
+            fetch_page, per_page, max_pages, max_workers, progress_callback, key
+        ):
+            yield from page
+
+    def iter_tickets(
+        self,
+        query=None,
+        fields=None,
+        max_pages=None,
+        max_workers=1,
+        progress_callback=None,
+        **params,
+    ):
+        """
+        Lazily yields tickets. query is a Freshservice filter expression such
+        as "priority:3 AND status:2" and is evaluated server-side through
+        the tickets/filter endpoint. Without a query, extra keyword
+        arguments (updated_since, filter, order_type, include, ...) are
+        passed to the ticket list endpoint. fields limits the keys kept per
+        ticket, and max_workers above 1 prefetches pages concurrently.
+        """
+        if query:
+            endpoint, per_page = "tickets/filter", FILTER_PAGE_SIZE
+            params["query"] = f'"{query}"'
+        else:
+            endpoint, per_page = "tickets", 100
+        return self.iter_collection(
+            endpoint,
+            "tickets",
+            params=params,
+            fields=fields,
+            per_page=per_page,
+            max_pages=max_pages,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+        )
+
+    def export_requesters(
+        self,
+        output_file="requesters.ndjson",
+        format="ndjson",
+        per_page=100,
+        max_pages=200,
+        progress_callback=None,
+        max_workers=1,
+    ):
+        """
+        Streams requesters to disk page by page. "ndjson" writes one
+        requester per line; "json" writes the same compact
+        {"synced_at": ..., "requesters": [...]} document that the requester
+        directory reads. Output goes to a temporary file that is renamed
+        over output_file only once the sync completes. Returns the number of
+        requesters written.
+        """
+        if format not in ("ndjson", "json"):
+            raise ValueError(f"Unsupported export format: {format}")
+
+        synced_at = datetime.now(timezone.utc).isoformat()
+        count = 0
+        with atomic_write(output_file) as f:
+            if format == "json":
+                f.write(f'{{"synced_at": {json.dumps(synced_at)}, "requesters": [')
+            for requester in self.iter_requesters(
+                per_page, max_pages, progress_callback, max_workers
+            ):
+                line = json.dumps(requester, separators=(",", ":"))
+                if format == "json":
+                    f.write(("," if count else "") + "\n" + line)
+                else:
+                    f.write(line + "\n")
+                count += 1
+            if format == "json":
+                f.write("\n]}\n")
+
+        if format == "json" and os.path.abspath(output_file) == os.path.abspath(
+            self.directory.path
+        ):
+            self.directory.invalidate()
+        print(f"Exported {count} requesters to {output_file}")
+        if progress_callback:
+            progress_callback("Complete!")
+        return count
+
+    def get_requesters(
+        self,
+        output_file="requesters.json",
+        per_page=100,
+        max_pages=200,
+        progress_callback=None,
+        max_workers=1,
+    ):
+        """
+        Gets all the non-agent requesters from FreshService and formats it
+        in a JSON file. Set max_workers above 1 to fetch pages concurrently.
+        The sync start time is saved alongside the requesters as the
+        watermark for sync_requesters.
+        """
+        synced_at = datetime.now(timezone.utc).isoformat()
+        all_requesters = list(
+            self.iter_requesters(per_page, max_pages, progress_callback, max_workers)
+        )
 
         # Update progress for saving file
         if progress_callback:
             progress_callback("Saving requesters to file...")
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump({"requesters": all_requesters}, f, indent=4)
+        self._save_requesters(output_file, all_requesters, synced_at)
+        if self.store is not None:
+            self.store.replace(all_requesters, synced_at)
         print(f"Total requesters fetched: {len(all_requesters)}")
         print(f"Data saved to {output_file}")
 
@@ -135,18 +2400,196 @@ class FreshServiceAPI:
 
         return {"requesters": all_requesters}
 
-    def update_requester_file(self, progress_callback=None, completion_callback=None):
+    def _save_requesters(self, output_file, requesters, synced_at):
+        with atomic_write(output_file) as f:
+            json.dump(
+                {"synced_at": synced_at, "requesters": requesters},
+                f,
+                separators=(",", ":"),
+            )
+        # Refresh the in-memory index when its backing file was rewritten
+        if os.path.abspath(output_file) == os.path.abspath(self.directory.path):
+            self.directory.replace(requesters)
+            self.directory.version = file_version(output_file)
+
+    def get_requester_id(self, email):
+        """
+        Looks up a requester ID by email in the cached requester directory.
+        """
+        if self.store is not None:
+            requester = self.store.get_by_email(email)
+        else:
+            requester = self.directory.get_by_email(email)
+        return requester.get("id") if requester else None
+
+    def sync_requesters(
+        self,
+        output_file="requesters.json",
+        per_page=100,
+        max_pages=200,
+        progress_callback=None,
+        max_workers=1,
+    ):
+        """
+        Incrementally syncs the requesters file. Only requesters updated
+        since the watermark saved by the previous sync are fetched and merged
+        in by id; records that come back with "active": false are dropped.
+        Falls back to a full get_requesters if there is no usable file.
+        """
+        try:
+            with open(output_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            watermark = datetime.fromisoformat(data["synced_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.debug("No sync watermark found, running a full sync.")
+            return self.get_requesters(
+                output_file, per_page, max_pages, progress_callback, max_workers
+            )
+
+        synced_at = datetime.now(timezone.utc).isoformat()
+        # The filter only has day granularity, so overlap by a day; merging
+        # the same record twice is harmless.
+        since = (watermark - timedelta(days=1)).date().isoformat()
+        query = f"updated_at:>'{since}'"
+
+        def fetch_page(page, _per_page):
+            return self._fetch_requester_page(page, FILTER_PAGE_SIZE, query=query)
+
+        changed = [
+            requester
+            for page in self._iter_pages(
+                fetch_page, FILTER_PAGE_SIZE, max_pages, 1, progress_callback
+            )
+            for requester in page
+        ]
+
+        if progress_callback:
+            progress_callback("Merging changed requesters...")
+
+        by_id = {r.get("id"): r for r in data.get("requesters", [])}
+        inserted = updated = removed = 0
+        upserts, removed_ids = [], []
+        for requester in changed:
+            requester_id = requester.get("id")
+            if requester.get("active") is False:
+                removed_ids.append(requester_id)
+                if by_id.pop(requester_id, None) is not None:
+                    removed += 1
+                continue
+            upserts.append(requester)
+            if requester_id in by_id:
+                by_id[requester_id] = requester
+                updated += 1
+            else:
+                by_id[requester_id] = requester
+                inserted += 1
+
+        all_requesters = list(by_id.values())
+        self._save_requesters(output_file, all_requesters, synced_at)
+        if self.store is not None:
+            self.store.apply_changes(upserts, removed_ids, synced_at)
+        print(
+            f"Incremental sync: {inserted} added, {updated} updated, {removed} removed."
+        )
+
+        if progress_callback:
+            progress_callback("Complete!")
+
+        return {"requesters": all_requesters}
+
+    def shared_sync(
+        self,
+        output_file="requesters.json",
+        incremental=False,
+        max_age=None,
+        progress_callback=None,
+        max_workers=1,
+        per_page=100,
+        max_pages=200,
+        lease=600,
+        wait_timeout=None,
+    ):
+        """
+        Syncs the requesters file at most once across every process sharing
+        it. The sync runs under a SyncLease; if another process already
+        holds it, this waits for that sync to finish and loads its result
+        instead of downloading the directory again. With max_age (seconds),
+        a file written more recently than that is used as is.
+        Returns True if this process ran the sync. Raises TimeoutError if
+        another process still holds the lease after wait_timeout seconds.
+        """
+        coordinator = SyncLease(output_file, lease)
+        before = file_version(output_file)
+        if max_age is not None and before is not None:
+            if time.time() - before[0] / 1e9 < max_age:
+                self._load_shared(output_file)
+                return False
+
+        if not coordinator.acquire(timeout=0):
+            if progress_callback:
+                progress_callback("Waiting for another sync to finish...")
+            print("Another process is syncing requesters; waiting for it.")
+            coordinator.wait(wait_timeout)
+            if file_version(output_file) != before:
+                self._load_shared(output_file)
+                return False
+            # The other sync failed or gave up; run our own, but never
+            # while another live process still holds the lease.
+            if not coordinator.acquire(timeout=wait_timeout):
+                raise TimeoutError(
+                    f"Another process still holds {coordinator.path}; sync skipped."
+                )
+
+        try:
+            if file_version(output_file) != before:
+                # Another process finished a sync between our checks.
+                self._load_shared(output_file)
+                return False
+            sync = self.sync_requesters if incremental else self.get_requesters
+            sync(output_file, per_page, max_pages, progress_callback, max_workers)
+            return True
+        finally:
+            coordinator.release()
+
+    def _load_shared(self, output_file):
+        if os.path.abspath(output_file) == os.path.abspath(self.directory.path):
+            self.directory.load()
+
+    def update_requester_file(
+        self,
+        progress_callback=None,
+        completion_callback=None,
+        max_workers=1,
+        incremental=False,
+    ):
         """
         Updates the requesters.json file with the latest data from FreshService.
         Can be called with progress and completion callbacks for UI integration.
+        With incremental=True only requesters changed since the last sync are
+        fetched. Goes through shared_sync, so a sync already running in
+        another process is reused rather than repeated.
         """
+
         def worker():
             print("Updating requesters.json file...")
             try:
-                result = self.get_requesters(progress_callback=progress_callback)
+                synced = self.shared_sync(
+                    self.directory.path,
+                    incremental=incremental,
+                    progress_callback=progress_callback,
+                    max_workers=max_workers,
+                )
+                # The sync replaced the indexes; rebuild search here rather
+                # than on the first keystroke in the UI.
+                self.directory.prepare_search()
+                message = (
+                    "Requesters file updated successfully!"
+                    if synced
+                    else "Requesters file updated by another instance."
+                )
                 if completion_callback:
-                    completion_callback(True, "Requesters file updated successfully!")
-                return result
+                    completion_callback(True, message)
+                return synced
             except Exception as e:
                 error_msg = f"Failed to update requesters file: {str(e)}"
                 print(error_msg)
@@ -161,3 +2604,14 @@ class FreshServiceAPI:
             thread.start()
         else:
             return worker()
+
+
+
+def __getattr__(name):
+    # The asyncio client lives in its own module so that importing fresh
+    # (and starting the GUI) does not pay for importing asyncio.
+    if name == "AsyncFreshServiceAPI":
+        from fresh_async import AsyncFreshServiceAPI
+
+        return AsyncFreshServiceAPI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
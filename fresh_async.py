@@ -0,0 +1,96 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from fresh import FreshServiceAPI
+
+
+class AsyncFreshServiceAPI:
+    """
+    asyncio front end for FreshServiceAPI. It wraps a sync client, so
+    payload building, rate limiting, retries and response handling are
+    shared, and runs its blocking calls on a dedicated executor sized to
+    max_concurrency. The pooled session is sized to match, and a semaphore
+    caps how many calls are in flight however many coroutines are awaiting.
+    """
+
+    def __init__(
+        self,
+        ticket_api_url,
+        requesters_api_url,
+        api_key,
+        max_concurrency=10,
+        **client_options,
+    ):
+        client_options.setdefault("pool_size", max_concurrency)
+        self.client = FreshServiceAPI(
+            ticket_api_url, requesters_api_url, api_key, **client_options
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="freshservice"
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs any blocking client call under the concurrency limit. New
+        FreshServiceAPI endpoints can be awaited through this directly.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def create_ticket(self, *args, **kwargs):
+        return await self.run(self.client.create_ticket, *args, **kwargs)
+
+    async def create_tickets(self, tickets):
+        """
+        Creates tickets concurrently and returns a TicketResult per ticket
+        in input order.
+        """
+        return await asyncio.gather(
+            *(
+                self.run(self.client._create_ticket_result, index, spec)
+                for index, spec in enumerate(tickets)
+            )
+        )
+
+    async def iter_requesters(self, per_page=100, max_pages=200, max_workers=4):
+        """
+        Asynchronously yields requesters, fetching up to max_workers pages
+        ahead in the background.
+        """
+        pages = self.client._iter_pages(
+            self.client._fetch_requester_page, per_page, max_pages, max_workers
+        )
+        try:
+            while True:
+                page = await self.run(next, pages, None)
+                if page is None:
+                    return
+                for requester in page:
+                    yield requester
+        finally:
+            # Closing waits for pages already in flight, so keep it off the
+            # loop; the default executor outlives ours during shutdown.
+            await asyncio.to_thread(pages.close)
+
+    async def get_requesters(self, per_page=100, max_pages=200, max_workers=4):
+        return [
+            requester
+            async for requester in self.iter_requesters(
+                per_page, max_pages, max_workers
+            )
+        ]
+
+    async def aclose(self):
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
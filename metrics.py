@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+def endpoint_label(url):
+    """
+    Reduces a request URL to a low-cardinality endpoint name: the path
+    below /api/v2/ with numeric ids replaced, e.g. "tickets/:id".
+    """
+    path = urlparse(url).path
+    _, marker, rest = path.partition("/api/v2/")
+    if marker:
+        path = rest
+    segments = [
+        ":id" if _ID_SEGMENT.match(segment) else segment
+        for segment in path.strip("/").split("/")
+    ]
+    return "/".join(segments)
+
+
+@dataclass
+class RequestEvent:
+    """
+    One logical API call, covering every retry made for it.
+    """
+
+    method: str
+    endpoint: str
+    status: int | None
+    latency: float
+    retries: int = 0
+    throttled: int = 0
+    wait: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    error: str | None = None
+    url: str = field(default="", repr=False)
+
+    @property
+    def ok(self):
+        return self.status is not None and self.status < 400
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus layout.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Thread-safe request counters and latency histograms for a
+    FreshServiceAPI instance, keyed by method, endpoint and status.
+    Hooks registered with add_hook receive every RequestEvent as it is
+    recorded; snapshot(), to_json() and to_prometheus() export the totals.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.errors = {}
+            self.latency = {}
+            self.endpoints = {}
+            self.counters = {}
+
+    def add_hook(self, hook):
+        """
+        Calls hook(event) for every request recorded from now on. Hooks run
+        on the requesting thread, so they should be quick.
+        """
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record(self, event):
+        key = (event.method, event.endpoint)
+        with self.lock:
+            status_key = (*key, str(event.status or "error"))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            if event.error:
+                error_key = (*key, event.error)
+                self.errors[error_key] = self.errors.get(error_key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(event.latency)
+            totals = self.endpoints.setdefault(
+                key,
+                {"retries": 0, "throttled": 0, "wait": 0.0, "bytes_sent": 0, "bytes_received": 0},
+            )
+            totals["retries"] += event.retries
+            totals["throttled"] += event.throttled
+            totals["wait"] += event.wait
+            totals["bytes_sent"] += event.bytes_sent
+            totals["bytes_received"] += event.bytes_received
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print(f"Metrics hook {hook!r} failed: {e}")
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Adds to a free-form counter, e.g. increment("cache_hits", endpoint="tickets").
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns the current totals as plain data, one entry per endpoint,
+        ordered by the total time spent in it.
+        """
+        with self.lock:
+            endpoints = []
+            for (method, endpoint), histogram in self.latency.items():
+                statuses = {
+                    status: count
+                    for (m, e, status), count in self.requests.items()
+                    if (m, e) == (method, endpoint)
+                }
+                errors = {
+                    error: count
+                    for (m, e, error), count in self.errors.items()
+                    if (m, e) == (method, endpoint)
+                }
+                endpoints.append(
+                    {
+                        "method": method,
+                        "endpoint": endpoint,
+                        "requests": histogram.count,
+                        "statuses": statuses,
+                        "errors": errors,
+                        "latency_total": histogram.sum,
+                        "latency_mean": histogram.sum / histogram.count,
+                        "latency_p50": histogram.quantile(0.5),
+                        "latency_p95": histogram.quantile(0.95),
+                        **self.endpoints[(method, endpoint)],
+                    }
+                )
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ]
+        endpoints.sort(key=lambda e: e["latency_total"], reverse=True)
+        return {"endpoints": endpoints, "counters": counters}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix="freshservice"):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def labels(**values):
+            return ",".join(f'{k}="{_escape(v)}"' for k, v in values.items())
+
+        with self.lock:
+            header("requests_total", "counter", "API requests by method, endpoint and status.")
+            for (method, endpoint, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f"{prefix}_requests_total{{{labels(method=method, endpoint=endpoint, status=status)}}} {count}"
+                )
+
+            header("request_errors_total", "counter", "API requests that failed without a response.")
+            for (method, endpoint, error), count in sorted(self.errors.items()):
+                lines.append(
+                    f"{prefix}_request_errors_total{{{labels(method=method, endpoint=endpoint, error=error)}}} {count}"
+                )
+
+            header(
+                "request_duration_seconds",
+                "histogram",
+                "Request latency including retries and rate-limit waits.",
+            )
+            for (method, endpoint), histogram in sorted(self.latency.items()):
+                base = labels(method=method, endpoint=endpoint)
+                for bound, total in histogram.cumulative():
+                    lines.append(
+                        f'{prefix}_request_duration_seconds_bucket{{{base},le="{bound}"}} {total}'
+                    )
+                lines.append(
+                    f'{prefix}_request_duration_seconds_bucket{{{base},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{base}}} {histogram.sum}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{base}}} {histogram.count}")
+
+            for name, kind, help_text in (
+                ("retries", "counter", "Retries made after throttling or transient failures."),
+                ("throttled", "counter", "429 responses received."),
+                ("wait", "counter", "Seconds spent waiting on the rate limiter."),
+                ("bytes_sent", "counter", "Request body bytes sent."),
+                ("bytes_received", "counter", "Response body bytes received."),
+            ):
+                metric = f"request_{name}_total" if name != "wait" else "rate_limit_wait_seconds_total"
+                header(metric, kind, help_text)
+                for (method, endpoint), totals in sorted(self.endpoints.items()):
+                    lines.append(
+                        f"{prefix}_{metric}{{{labels(method=method, endpoint=endpoint)}}} {totals[name]}"
+                    )
+
+            for (name, label_items), value in sorted(self.counters.items()):
+                label_text = labels(**dict(label_items))
+                lines.append(f"{prefix}_{name}_total{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, format="prometheus"):
+        """
+        Writes the metrics to path ("prometheus" or "json"), replacing the
+        file atomically so a node_exporter textfile collector or other
+        reader never sees a partial file.
+        """
+        text = self.to_prometheus() if format == "prometheus" else self.to_json()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LoggingExporter:
+    """
+    Metrics hook that logs each request as a structured record. Successful
+    requests are logged at DEBUG, retried ones at INFO and failures at
+    WARNING; the event fields are attached to the record as extra data.
+
+        api.metrics.add_hook(LoggingExporter())
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("fresh.requests")
+
+    def __call__(self, event):
+        if not event.ok:
+            level = logging.WARNING
+        elif event.retries:
+            level = logging.INFO
+        else:
+            level = logging.DEBUG
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(
+            level,
+            "%s %s -> %s in %.3fs (retries=%d, %d bytes)",
+            event.method,
+            event.endpoint,
+            event.status or event.error,
+            event.latency,
+            event.retries,
+            event.bytes_received,
+            extra={"request_event": asdict(event)},
+        )
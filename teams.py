@@ -0,0 +1,204 @@
+import queue
+import threading
+import time
+
+import requests
+
+from fresh import DEFAULT_TIMEOUT, RETRY_STATUSES, backoff_delay, parse_retry_after
+
+
+def build_ticket_card(
+    ticket_url=None,
+    requester=None,
+    subject=None,
+    category=None,
+    description=None,
+    priority=None,
+):
+    """
+    Builds the Adaptive Card body for a single new ticket.
+    """
+    # Build a nicely formatted message using Markdown
+    card_body = [
+        {"type": "TextBlock", "text": "**New ticket created:**", "wrap": True},
+    ]
+    if requester:
+        card_body.append(
+            {
+                "type": "TextBlock",
+                "text": f"**Requester:** {requester}",
+                "wrap": True,
+            }
+        )
+    if subject:
+        card_body.append(
+            {"type": "TextBlock", "text": f"**Subject:** {subject}", "wrap": True}
+        )
+    if category:
+        card_body.append(
+            {"type": "TextBlock", "text": f"**Category:** {category}", "wrap": True}
+        )
+    if priority:
+        card_body.append(
+            {"type": "TextBlock", "text": f"**Priority:** {priority}", "wrap": True}
+        )
+    if description:
+        card_body.append(
+            {
+                "type": "TextBlock",
+                "text": f"**Description:** {description}",
+                "wrap": True,
+            }
+        )
+    if ticket_url:
+        card_body.append(
+            {
+                "type": "TextBlock",
+                "text": f"[Ticket URL]({ticket_url})",
+                "wrap": True,
+            }
+        )
+    return card_body
+
+
+def build_digest_card(notifications):
+    """
+    Builds one Adaptive Card body summarising several new tickets.
+    """
+    card_body = [
+        {
+            "type": "TextBlock",
+            "text": f"**{len(notifications)} new tickets created:**",
+            "wrap": True,
+        },
+    ]
+    for n in notifications:
+        line = " - ".join(
+            part for part in (n.get("requester"), n.get("category")) if part
+        )
+        if n.get("ticket_url"):
+            line = f"[{line or 'Ticket'}]({n['ticket_url']})"
+        card_body.append({"type": "TextBlock", "text": f"- {line}", "wrap": True})
+    return card_body
+
+
+def wrap_card(card_body):
+    return {
+        "attachments": [
+            {
+                "contentType": "application/vnd.microsoft.card.adaptive",
+                "contentUrl": None,
+                "content": {
+                    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+                    "type": "AdaptiveCard",
+                    "version": "1.0",
+                    "body": card_body,
+                },
+            }
+        ]
+    }
+
+
+class TeamsNotifier:
+    """
+    Sends new-ticket notifications to a Teams webhook from a background
+    thread. Notifications arriving within coalesce_window seconds of each
+    other are merged into a single digest card, posts are spaced at least
+    min_interval seconds apart, and throttled (429) or failed (5xx) posts
+    are retried with backoff.
+    """
+
+    def __init__(
+        self,
+        webhook_url,
+        coalesce_window=2.0,
+        max_batch=20,
+        min_interval=1.0,
+        max_retries=4,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.webhook_url = webhook_url
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._queue = queue.Queue()
+        self._last_post = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def notify(self, **notification):
+        """
+        Queues a notification; accepts the build_ticket_card arguments.
+        """
+        self._queue.put(notification)
+
+    def close(self, timeout=10):
+        """
+        Sends whatever is still queued and stops the worker.
+        """
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.session.close()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._send(batch)
+            except Exception as e:
+                print(f"Failed to send message to Teams: {e}")
+            if stopping:
+                return
+
+    def _send(self, batch):
+        if len(batch) == 1:
+            payload = wrap_card(build_ticket_card(**batch[0]))
+        else:
+            payload = wrap_card(build_digest_card(batch))
+
+        response = None
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_post + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_post = time.monotonic()
+            try:
+                response = self.session.post(
+                    self.webhook_url, json=payload, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"Failed to send message to Teams: {e}")
+                time.sleep(backoff_delay(attempt, base=1.0))
+                continue
+            if response.status_code in (200, 202):
+                print(f"Message sent to Teams successfully ({len(batch)} ticket(s)).")
+                return True
+            if response.status_code not in RETRY_STATUSES:
+                break
+            delay = parse_retry_after(response)
+            time.sleep(delay if delay is not None else backoff_delay(attempt, base=1.0))
+
+        if response is not None:
+            print(f"Failed to send message to Teams: {response.status_code}")
+            print(f"Response: {response.text}")
+        return False
@@ -0,0 +1,212 @@
+import json
+import re
+import string
+
+from fresh import TICKET_FIELDS
+
+PRIORITIES = {"low": 1, "medium": 2, "high": 3, "urgent": 4}
+STATUSES = {"open": 2, "pending": 3, "resolved": 4, "closed": 5}
+TICKET_TYPES = ("Incident", "Service Request")
+
+# Values every template can use in its subject and description
+PLACEHOLDERS = {"name", "requester", "first_name", "last_name", "email", "category", "description"}
+
+# Keys a template definition may contain besides the ticket fields
+TEMPLATE_KEYS = {"custom_fields", "fields", "required"}
+
+# Ticket fields a caller may set directly when rendering a template
+DIRECT_FIELDS = ("status", "requester_id", "responder_id", "group_id", "location")
+
+SUBJECT_MAX_LENGTH = 255
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class TemplateError(ValueError):
+    """
+    Raised for an invalid template definition or a ticket that does not
+    satisfy its template.
+    """
+
+
+def _placeholders(text, where):
+    try:
+        return {
+            name.split(".")[0].split("[")[0]
+            for _, name, _, _ in string.Formatter().parse(text)
+            if name is not None
+        }
+    except ValueError as e:
+        raise TemplateError(f"{where}: {e}") from None
+
+
+def _lookup(table, value, what, where):
+    if isinstance(value, int) and value in table.values():
+        return value
+    number = table.get(str(value).strip().lower())
+    if number is None:
+        raise TemplateError(f"{where}: unknown {what} {value!r}")
+    return number
+
+
+class TicketTemplate:
+    """
+    One compiled ticket type. The definition is validated once, when it is
+    compiled; render() only fills in the subject and description and checks
+    the values supplied for this ticket.
+    """
+
+    def __init__(self, name, definition, defaults=None):
+        where = f"Template {name!r}"
+        merged = {**(defaults or {}), **definition}
+        custom_fields = {
+            **(defaults or {}).get("custom_fields", {}),
+            **definition.get("custom_fields", {}),
+        }
+        unknown = set(merged) - set(TICKET_FIELDS) - TEMPLATE_KEYS
+        if unknown:
+            raise TemplateError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.inputs = PLACEHOLDERS | set(merged.get("fields", ()))
+        self.required = tuple(merged.get("required", ("description",)))
+        missing = set(self.required) - self.inputs
+        if missing:
+            raise TemplateError(f"{where}: required fields {sorted(missing)} are not inputs")
+
+        self.subject = merged.get("subject", "{name}")
+        self.description = merged.get("description", "{description}")
+        for field, text in (("subject", self.subject), ("description", self.description)):
+            unknown = _placeholders(text, where) - self.inputs
+            if unknown:
+                raise TemplateError(f"{where}: unknown placeholders in {field}: {sorted(unknown)}")
+
+        base = {"category": merged.get("category", name)}
+        if "priority" in merged:
+            base["priority"] = _lookup(PRIORITIES, merged["priority"], "priority", where)
+        if "status" in merged:
+            base["status"] = _lookup(STATUSES, merged["status"], "status", where)
+        if "type" in merged:
+            if merged["type"] not in TICKET_TYPES:
+                raise TemplateError(f"{where}: type must be one of {TICKET_TYPES}")
+            base["type"] = merged["type"]
+        for field in ("group_id", "responder_id", "location"):
+            if merged.get(field) is not None:
+                base[field] = merged[field]
+        if custom_fields:
+            base["custom_fields"] = custom_fields
+        self.base = base
+
+    def render(self, priority=None, type=None, **values):
+        """
+        Returns create_ticket keyword arguments for one ticket. values holds
+        the template inputs (description, email, requester, ...) plus any
+        ticket fields to set directly, such as requester_id; priority and
+        type override the template defaults when given.
+        """
+        where = f"Template {self.name!r}"
+        context = {key: "" for key in self.inputs}
+        context.update((key, "" if value is None else value) for key, value in values.items())
+        context["name"] = self.name
+        if not context["category"]:
+            context["category"] = self.name
+        if not context["requester"]:
+            context["requester"] = f"{context['first_name']} {context['last_name']}".strip()
+
+        missing = [field for field in self.required if not str(context.get(field, "")).strip()]
+        if missing:
+            raise TemplateError(f"{where}: missing {', '.join(missing)}")
+        email = values.get("email")
+        if email and not _EMAIL.match(email):
+            raise TemplateError(f"{where}: invalid email {email!r}")
+
+        spec = dict(self.base)
+        spec["subject"] = self.subject.format_map(context)
+        spec["description"] = self.description.format_map(context)
+        if len(spec["subject"]) > SUBJECT_MAX_LENGTH:
+            raise TemplateError(f"{where}: subject longer than {SUBJECT_MAX_LENGTH} characters")
+        if priority:
+            spec["priority"] = _lookup(PRIORITIES, priority, "priority", where)
+        if type:
+            if type not in TICKET_TYPES:
+                raise TemplateError(f"{where}: type must be one of {TICKET_TYPES}")
+            spec["type"] = type
+        spec.setdefault("status", STATUSES["open"])
+        for field in DIRECT_FIELDS:
+            if values.get(field) is not None:
+                spec[field] = values[field]
+        spec["status"] = _lookup(STATUSES, spec["status"], "status", where)
+        if email:
+            spec["email"] = email
+        return spec
+
+
+class TicketTemplates:
+    """
+    The set of ticket templates loaded from a definitions file:
+
+        {
+            "defaults": {"status": "Open", "subject": "..."},
+            "templates": {"Password Reset": {"category": "Active Directory", ...}}
+        }
+
+    Every template is compiled when the file is loaded, so a bad definition
+    fails at startup instead of as a 400 from the API.
+    """
+
+    def __init__(self, definitions):
+        defaults = definitions.get("defaults", {})
+        self.templates = {
+            name: TicketTemplate(name, definition, defaults)
+            for name, definition in definitions.get("templates", {}).items()
+        }
+
+    @classmethod
+    def load(cls, path="ticket_templates.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def names(self):
+        return list(self.templates)
+
+    def get(self, name):
+        template = self.templates.get(name)
+        if template is None:
+            raise TemplateError(f"Unknown ticket template: {name!r}")
+        return template
+
+    def render(self, name, **values):
+        return self.get(name).render(**values)
+
+    def render_spec(self, spec):
+        """
+        Renders a bulk-creation spec that names its template under
+        "template"; specs without one are returned unchanged.
+        """
+        if not spec.get("template"):
+            return spec
+        values = dict(spec)
+        attachments = values.pop("attachments", None)
+        rendered = self.render(values.pop("template"), **values)
+        if attachments:
+            rendered["attachments"] = attachments
+        return rendered
+
+    def check_choices(self, reference):
+        """
+        Returns the templates whose category is not one of the service
+        choices currently configured in Freshservice (needs reference data).
+        """
+        choices = set(reference.choices("please_select_the_service"))
+        if not choices:
+            return []
+        return [
+            name
+            for name, template in self.templates.items()
+            if template.base["category"] not in choices
+        ]
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def __len__(self):
+        return len(self.templates)
@@ -1,10 +1,9 @@
 import customtkinter
-import requests
-from CTkMessagebox import CTkMessagebox
-from fresh import FreshServiceAPI
+from fresh import FreshServiceAPI, TicketOutbox
+from ticket_templates import TemplateError, TicketTemplates
 from dotenv import load_dotenv
-import json
 import os
+import queue
 import threading
 import time
 
@@ -22,17 +21,19 @@ if not API_KEY or not TICKET_API_URL or not REQUESTERS_API_URL:
         "API_KEY, TICKET_API_URL, and REQUESTERS_API_URL must be set in the environment variables."
     )
 
-# Init API class
-api = FreshServiceAPI(TICKET_API_URL, REQUESTERS_API_URL, API_KEY)
+# Init API class; the connection is opened and the API key checked in the
+# background while the window is built
+api = FreshServiceAPI(TICKET_API_URL, REQUESTERS_API_URL, API_KEY, warm_up=True)
 
-# Verify that the requesters.json file exists
-if not os.path.exists("requesters.json"):
-    api.get_requesters()
-    print(
-        "Requesters file not found. Fetching requesters from API and creating requesters.json."
-    )
-else:
-    print("Requesters file found. Using existing data.")
+# Tickets are persisted here before they are sent, so none are lost offline
+outbox = TicketOutbox("outbox.db")
+
+# Teams notifications are sent and coalesced on a background thread
+notifier = None
+if os.getenv("WEBHOOK"):
+    from teams import TeamsNotifier
+
+    notifier = TeamsNotifier(os.getenv("WEBHOOK"))
 
 request_type_values = [
     "",
@@ -40,44 +41,12 @@ request_type_values = [
     "Service Request",
 ]
 
-# Map display names to Freshservice API values
-service_field_map = {
-    "Password Reset": "Active Directory",
-    "Account Lockout": "Active Directory",
-    "Software Installation": "Software",
-    "Laptop Issue": "Laptop",
-    "DOMO": "DOMO",
-    "Desktop Issue": "Desktop",
-    "Network Connectivity": "Network",
-    "Wi-Fi": "Wi-Fi",
-    "WorkDay": "WorkDay",
-    "Printer Issue": "Printer",
-    "Hardware Request": "Hardware Refresh",
-    "Other": "Other",
-    "WorldShip": "WorldShip",
-    "RF Gun": "RF Guns",
-    "Apex": "Apex",
-    "": "Other",  # fallback for blank
-}
-
-ticket_categories = [
-    "",
-    "Apex",
-    "Password Reset",
-    "Account Lockout",
-    "Software Installation",
-    "Laptop Issue",
-    "Desktop Issue",
-    "DOMO",
-    "Network Connectivity",
-    "Printer Issue",
-    "Hardware Request",
-    "Other",
-    "WorldShip",
-    "WorkDay",
-    "Wi-Fi",
-    "RF Gun",
-]
+# Ticket types, their Freshservice service values and defaults; compiled
+# and validated once at startup
+templates = TicketTemplates.load("ticket_templates.json")
+api.templates = templates
+
+ticket_categories = ["", *templates.names()]
 
 ticket_priorities = [
     "Low",
@@ -200,6 +169,61 @@ class App(customtkinter.CTk):
         )
         self.update_requesters_button.place(x=30, y=500)
 
+        self.pending_label = customtkinter.CTkLabel(
+            self.left_frame,
+            font=customtkinter.CTkFont("Roboto", size=12),
+            width=140,
+            text="",
+        )
+        self.pending_label.place(x=30, y=465)
+
+        self.cache_status_label = customtkinter.CTkLabel(
+            self.left_frame,
+            font=customtkinter.CTkFont("Roboto", size=12),
+            width=140,
+            text="",
+        )
+        self.cache_status_label.place(x=30, y=440)
+
+        self.connection_label = customtkinter.CTkLabel(
+            self.left_frame,
+            font=customtkinter.CTkFont("Roboto", size=12),
+            width=140,
+            text="Connecting...",
+        )
+        self.connection_label.place(x=30, y=415)
+
+        # Network work runs on background threads; anything that touches
+        # widgets is queued back and run on the Tk thread by poll_ui_queue.
+        self.ui_queue = queue.Queue()
+        self.after(100, self.poll_ui_queue)
+
+        # Tickets are delivered by the outbox worker, including any left
+        # undelivered by a previous session.
+        outbox.start_worker(
+            api,
+            on_delivered=self.on_ticket_delivered,
+            on_failed=self.on_ticket_failed,
+        )
+        self.update_pending_label()
+
+        # The window is shown before the requester cache is ready
+        self.load_requester_cache()
+
+        # Groups, agents, locations and field choices, refreshed every 30 min;
+        # templates are re-checked against the service choices each time.
+        self.invalid_templates = []
+        api.reference.start_refresh(interval=1800, callback=self.check_templates)
+
+        # Connection status, re-checked every 2 minutes; the probe also keeps
+        # a pooled connection warm between tickets.
+        self.auth_error_shown = False
+        api.health.start(
+            interval=120,
+            callback=lambda status: self.run_on_ui(
+                lambda: self.set_connection_status(status)
+            ),
+        )
 
         self.main_frame = customtkinter.CTkFrame(self, width=660, height=580)
         self.main_frame.place(x=225, y=10)
@@ -239,6 +263,20 @@ class App(customtkinter.CTk):
         self.last_name_entry = customtkinter.CTkEntry(self.main_frame, width=180)
         self.last_name_entry.place(x=240, y=170)
 
+        # Type-ahead requester matches for the name entries
+        self.requester_selector = customtkinter.CTkOptionMenu(
+            self.main_frame,
+            values=[""],
+            width=200,
+            command=self.on_requester_selected,
+        )
+        self.requester_selector.place(x=440, y=170)
+        self.requester_matches = {}
+        self.selected_requester = None
+        self.search_job = None
+        for entry in (self.first_name_entry, self.last_name_entry):
+            entry.bind("<KeyRelease>", self.schedule_requester_search)
+
         self.category_label = customtkinter.CTkLabel(
             self.main_frame,
             font=customtkinter.CTkFont("Roboto", size=16, weight="bold", underline=1),
@@ -305,10 +343,14 @@ class App(customtkinter.CTk):
         """
         Displays an error message in a message box.
         """
+        from CTkMessagebox import CTkMessagebox
+
         CTkMessagebox(title="Error", message=message, icon="cancel").show()
         print(f"Error: {message}")
 
     def show_success(self, message):
+        from CTkMessagebox import CTkMessagebox
+
         CTkMessagebox(title="Success", message=message, icon="check")
         print(f"Success: {message}")
 
@@ -323,157 +365,272 @@ class App(customtkinter.CTk):
         priority=None,
     ):
         """
-        Sends a formatted message to Microsoft Teams using a webhook with an attachment (Adaptive Card).
+        Queues a new-ticket notification for Microsoft Teams. The notifier
+        posts it in the background, merging bursts into a digest card.
         """
-        webhook_url = os.getenv("WEBHOOK")
-        # Build a nicely formatted message using Markdown
-        card_body = [
-            {"type": "TextBlock", "text": "**New ticket created:**", "wrap": True},
-        ]
-        if requester:
-            card_body.append(
-                {
-                    "type": "TextBlock",
-                    "text": f"**Requester:** {requester}",
-                    "wrap": True,
-                }
-            )
-        if subject:
-            card_body.append(
-                {"type": "TextBlock", "text": f"**Subject:** {subject}", "wrap": True}
-            )
-        if category:
-            card_body.append(
-                {"type": "TextBlock", "text": f"**Category:** {category}", "wrap": True}
-            )
-        if priority:
-            card_body.append(
-                {"type": "TextBlock", "text": f"**Priority:** {priority}", "wrap": True}
-            )
-        if description:
-            card_body.append(
-                {
-                    "type": "TextBlock",
-                    "text": f"**Description:** {description}",
-                    "wrap": True,
-                }
+        if notifier is None:
+            print("WEBHOOK not set; skipping Teams notification.")
+            return False
+        notifier.notify(
+            ticket_url=ticket_url,
+            requester=requester,
+            subject=subject,
+            category=category,
+            description=description,
+            priority=priority,
+        )
+        return True
+
+    def run_on_ui(self, callback):
+        """
+        Schedules a callback to run on the Tk main thread. Safe to call from
+        any thread.
+        """
+        self.ui_queue.put(callback)
+
+    def poll_ui_queue(self):
+        """
+        Runs callbacks queued by background threads, then reschedules itself.
+        """
+        while True:
+            try:
+                callback = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            callback()
+        self.after(100, self.poll_ui_queue)
+
+    def check_templates(self, reference):
+        """
+        Runs on the reference refresh thread, which has just loaded the
+        service choices the check needs.
+        """
+        invalid = templates.check_choices(reference)
+        self.run_on_ui(lambda: self.set_invalid_templates(invalid))
+
+    def set_invalid_templates(self, invalid):
+        """
+        Hides templates whose category is not a service choice configured in
+        Freshservice, so they cannot be sent only to fail with a 400.
+        """
+        if invalid == self.invalid_templates:
+            return
+        self.invalid_templates = invalid
+        self.category_selector.configure(
+            values=[name for name in ticket_categories if name not in invalid]
+        )
+        if self.category_selector.get() in invalid:
+            self.category_selector.set("")
+        if invalid:
+            message = (
+                "These ticket types do not match a service in Freshservice and were "
+                f"disabled: {', '.join(invalid)}. Check ticket_templates.json."
             )
-        if ticket_url:
-            card_body.append(
-                {
-                    "type": "TextBlock",
-                    "text": f"[Ticket URL]({ticket_url})",
-                    "wrap": True,
-                }
+            print(message)
+            self.show_error(message)
+
+    def set_cache_status(self, text):
+        self.cache_status_label.configure(text=text)
+
+    def set_connection_status(self, status):
+        if status.authenticated is False:
+            self.connection_label.configure(text="API key rejected")
+            if not self.auth_error_shown:
+                self.auth_error_shown = True
+                self.show_error("Freshservice rejected the API key. Check API_KEY in .env.")
+        elif status.available:
+            self.connection_label.configure(
+                text=f"Connected ({status.latency * 1000:.0f} ms)"
             )
-        payload = {
-            "attachments": [
-                {
-                    "contentType": "application/vnd.microsoft.card.adaptive",
-                    "contentUrl": None,
-                    "content": {
-                        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-                        "type": "AdaptiveCard",
-                        "version": "1.0",
-                        "body": card_body,
-                    },
-                }
-            ]
+        else:
+            self.connection_label.configure(text="Freshservice unreachable")
+
+    def load_requester_cache(self):
+        """
+        Loads requesters.json, or downloads it if missing, on a background
+        thread and builds the search index, reporting progress in the side
+        panel. The thread then reloads the file whenever another instance
+        rewrites it.
+        """
+
+        def report(text):
+            self.run_on_ui(lambda: self.set_cache_status(text))
+
+        def worker():
+            try:
+                if os.path.exists(api.directory.path):
+                    print("Requesters file found. Using existing data.")
+                    report("Loading requesters...")
+                    api.directory.load()
+                else:
+                    print(
+                        "Requesters file not found. Fetching requesters from API and creating requesters.json."
+                    )
+                    # Waits for, rather than repeats, a download already
+                    # started by another instance sharing the file.
+                    api.shared_sync(max_workers=4, progress_callback=report)
+                api.directory.prepare_search()
+                report(f"{len(api.directory)} requesters loaded")
+            except Exception as e:
+                print(f"Failed to load requesters: {e}")
+                report("Requesters unavailable")
+                # Serve whatever is on disk (possibly nothing) instead of
+                # "Loading requesters..."; the loop below picks up a file
+                # written later by another instance.
+                try:
+                    api.directory.load()
+                    api.directory.prepare_search()
+                except Exception as e:
+                    print(f"Failed to load requesters: {e}")
+
+            # Pick up syncs made by other instances
+            while True:
+                time.sleep(30)
+                try:
+                    if api.directory.reload_if_changed():
+                        api.directory.prepare_search()
+                        report(f"{len(api.directory)} requesters loaded")
+                except Exception as e:
+                    print(f"Failed to reload requesters: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def schedule_requester_search(self, event=None):
+        """
+        Debounces type-ahead lookups while the operator is typing.
+        """
+        self.selected_requester = None
+        if self.search_job:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(150, self.update_requester_suggestions)
+
+    def update_requester_suggestions(self):
+        """
+        Refreshes the requester dropdown from the directory search index.
+        """
+        self.search_job = None
+        query = f"{self.first_name_entry.get()} {self.last_name_entry.get()}"
+        if not api.directory.ready:
+            # Never load or index the directory on the UI thread
+            self.requester_matches = {}
+            self.requester_selector.configure(values=[""])
+            self.requester_selector.set("Loading requesters..." if query.strip() else "")
+            return
+        matches = api.directory.search(query, limit=8) if query.strip() else []
+        self.requester_matches = {
+            f"{r.get('first_name', '')} {r.get('last_name', '')} <{r.get('email')}>": r
+            for r in matches
         }
-        response = requests.post(webhook_url, json=payload)
-        if response.status_code == 200:
-            print("Message sent to Teams successfully.")
-            return True
+        labels = list(self.requester_matches) or [""]
+        self.requester_selector.configure(values=labels)
+        # Only pick a requester automatically on an exact or prefix match; a
+        # lone fuzzy hit ("Mario" -> "Maria") must be chosen by the operator.
+        if len(matches) == 1 and api.directory.search(query, limit=1, fuzzy=False):
+            self.requester_selector.set(labels[0])
+            self.selected_requester = matches[0]
+        elif len(matches) == 1:
+            self.requester_selector.set("1 possible match...")
+        elif matches:
+            self.requester_selector.set(f"{len(matches)} matches...")
         else:
-            print(f"Failed to send message to Teams: {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+            self.requester_selector.set("")
+
+    def on_requester_selected(self, label):
+        requester = self.requester_matches.get(label)
+        self.selected_requester = requester
+        if requester:
+            self.first_name_entry.delete(0, "end")
+            self.first_name_entry.insert(0, requester.get("first_name") or "")
+            self.last_name_entry.delete(0, "end")
+            self.last_name_entry.insert(0, requester.get("last_name") or "")
+
+    def update_pending_label(self):
+        pending = len(outbox.pending())
+        if pending:
+            self.pending_label.configure(text=f"{pending} ticket(s) waiting to send")
+        else:
+            self.pending_label.configure(text="")
 
     def create_ticket(self):
         """
         Creates a ticket using the Freshservice API with the provided details.
+        The ticket is saved to the outbox and the form cleared immediately;
+        the outbox worker delivers it and the Teams notification follows.
         """
-        requester_name = f"{self.first_name_entry.get()} {self.last_name_entry.get()}"
-        subject = "Issue Reported by " + requester_name.title()
+        requester_name = f"{self.first_name_entry.get()} {self.last_name_entry.get()}".title()
         description = self.description_box.get("1.0", "end-1c")
         category = self.category_selector.get()
-        email = f"{self.first_name_entry.get().lower()}.{self.last_name_entry.get().lower()}{os.getenv('EMAIL_DOMAIN')}"
-        requester_id = self.get_requester_id(email)
+        if self.selected_requester:
+            email = self.selected_requester.get("email")
+            requester_id = self.selected_requester.get("id")
+        else:
+            email = f"{self.first_name_entry.get().lower()}.{self.last_name_entry.get().lower()}{os.getenv('EMAIL_DOMAIN')}"
+            # While the directory is still loading, send the email alone
+            # and let Freshservice match the requester.
+            requester_id = self.get_requester_id(email) if api.directory.ready else None
+        priority = self.priority_selector.get()
 
         if not category or not description:
             self.show_error("All fields are required.")
             return
 
-        # Build ticket data
-        # Map priority string to integer as required by API
-        priority_map = {"Low": 1, "Medium": 2, "High": 3, "Urgent": 4}
-        priority_value = priority_map.get(self.priority_selector.get(), 1)
-        ticket_data = {
-            "subject": f"{subject} - {category}",
+        try:
+            ticket_data = templates.render(
+                category,
+                requester=requester_name,
+                description=description,
+                email=email,
+                requester_id=requester_id,
+                priority=priority,
+                type=self.ticket_type_selector.get(),
+            )
+        except TemplateError as e:
+            self.show_error(str(e))
+            return
+        notification = {
+            "requester": requester_name,
+            "subject": ticket_data["subject"],
+            "category": category,
             "description": description,
-            "type": self.ticket_type_selector.get(),
-            "email": email,
-            "priority": priority_value,
-            "status": 2,
-            "requester_id": requester_id,
-            "responder_id": None,
-            "group_id": None,
-            # int(os.getenv("GROUP_ID")),  # Load your group ID in the .env file as int
-            "custom_fields": {
-                "please_select_the_service": service_field_map.get(category, "Other")
-            },
+            "priority": priority,
         }
 
-        result = api.create_ticket(
-            subject=ticket_data["subject"],
-            description=ticket_data["description"],
-            email=ticket_data["email"],
-            priority=ticket_data["priority"],
-            status=ticket_data["status"],
-            type=ticket_data["type"],
-            requester_id=ticket_data["requester_id"],
-            responder_id=ticket_data["responder_id"],
-            group_id=ticket_data["group_id"],
-            category=ticket_data["custom_fields"]["please_select_the_service"],
-        )
-        print("Clearing entries after ticket creation.")
-        # Try to get the ticket ID from the API response
-        ticket_id = None
-        if isinstance(result, dict):
-            if "id" in result:
-                ticket_id = result["id"]
-            elif "ticket" in result and "id" in result["ticket"]:
-                ticket_id = result["ticket"]["id"]
-        if ticket_id:
-            ticket_url = f"https://{os.getenv('DOMAIN')}.freshservice.com/helpdesk/tickets/{ticket_id}"  # Replace 'domain' with your Freshservice domain
-            print(f"Ticket created successfully: {ticket_url}")
-            self.send_to_teams(
-                message=None,
-                ticket_url=ticket_url,
-                requester=requester_name.title(),
-                subject=f"Issue Reported by {requester_name.title()} - {category}",
-                category=category,
-                description=description,
-                priority=self.priority_selector.get(),
-            )
-            self.show_success("Ticket created successfully!")
-        else:
-            self.show_error(
-                "Ticket creation failed or ticket ID not found. No URL available."
-            )
+        outbox.enqueue(ticket_data, meta=notification)
+        self.update_pending_label()
+        print("Clearing entries after queueing ticket.")
         self.clear_entries()
 
-    # Get the requester ID based on the email from requesters.json
+    def on_ticket_delivered(self, item, ticket_id):
+        """
+        Runs on the outbox worker thread once a ticket has been created.
+        """
+        ticket_url = f"https://{os.getenv('DOMAIN')}.freshservice.com/helpdesk/tickets/{ticket_id}"  # Replace 'domain' with your Freshservice domain
+        print(f"Ticket created successfully: {ticket_url}")
+        if item["meta"]:
+            self.send_to_teams(message=None, ticket_url=ticket_url, **item["meta"])
+        self.run_on_ui(lambda: self.on_ticket_settled(True, "Ticket created successfully!"))
+
+    def on_ticket_failed(self, item, error):
+        """
+        Runs on the outbox worker thread when a ticket is rejected or runs
+        out of retries. It stays in the outbox and can be replayed.
+        """
+        message = f"Ticket creation failed: {error}"
+        self.run_on_ui(lambda: self.on_ticket_settled(False, message))
+
+    def on_ticket_settled(self, success, message):
+        self.update_pending_label()
+        if success:
+            self.show_success(message)
+        else:
+            self.show_error(message)
+
+    # Get the requester ID based on the email from the cached directory
     def get_requester_id(self, email):
         """
         Fetches the requester ID based on the provided email.
         """
-        with open("requesters.json", "r") as file:
-            data = json.load(file)
-            for requester in data["requesters"]:
-                if requester.get("email") == email:
-                    return requester.get("id")
-        return None
+        return api.get_requester_id(email)
 
     def update_requesters_with_progress(self):
         """
@@ -484,10 +641,13 @@ class App(customtkinter.CTk):
 
         # Define progress callback
         def progress_callback(text):
-            progress_dialog.update_progress(text)
+            self.run_on_ui(lambda: progress_dialog.update_progress(text))
 
         # Define completion callback
         def completion_callback(success, message):
+            self.run_on_ui(lambda: on_completion(success, message))
+
+        def on_completion(success, message):
             progress_dialog.on_completion(success, message)
             if success:
                 # Optionally show a success message
@@ -499,7 +659,9 @@ class App(customtkinter.CTk):
         # Start the update process
         api.update_requester_file(
             progress_callback=progress_callback,
-            completion_callback=completion_callback
+            completion_callback=completion_callback,
+            max_workers=4,
+            incremental=True,
         )
 
     def clear_entries(self):  # noqa: F811
@@ -508,6 +670,10 @@ class App(customtkinter.CTk):
         """
         self.first_name_entry.delete(0, "end")
         self.last_name_entry.delete(0, "end")
+        self.requester_selector.configure(values=[""])
+        self.requester_selector.set("")
+        self.requester_matches = {}
+        self.selected_requester = None
         self.description_box.delete("1.0", "end")
         self.category_selector.set("")
         self.priority_selector.set("")
@@ -515,9 +681,13 @@ class App(customtkinter.CTk):
         print("All entries cleared.")
 
     def show_error(self, message):  # noqa: F811
+        from CTkMessagebox import CTkMessagebox
+
         CTkMessagebox(title="Error", message=message, icon="cancel")
 
     def show_success(self, message):
+        from CTkMessagebox import CTkMessagebox
+
         CTkMessagebox(title="Success", message=message, icon="check")
         print(f"Success: {message}")
 